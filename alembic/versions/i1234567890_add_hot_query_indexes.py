@@ -0,0 +1,62 @@
+"""add_hot_query_indexes
+
+Revision ID: i1234567890
+Revises: ce708ce88c85, h1234567890
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'i1234567890'
+down_revision = ('ce708ce88c85', 'h1234567890')
+branch_labels = None
+depends_on = None
+
+
+# (name, table, columns, partial WHERE clause)
+INDEXES = [
+    # Order history of a user (GET /orders) ordered by created_at
+    ('ix_orders_user_id_created_at', 'orders', ['user_id', 'created_at'], None),
+    # Payment webhook lookup
+    ('ix_orders_payment_id', 'orders', ['payment_id'], 'payment_id IS NOT NULL'),
+    # Analytics range scans
+    ('ix_orders_created_at_payment_status', 'orders', ['created_at', 'payment_status'], None),
+    # Admin order list filtered by status
+    ('ix_orders_status_created_at', 'orders', ['status', 'created_at'], None),
+    ('ix_order_items_order_id', 'order_items', ['order_id'], None),
+    ('ix_order_items_product_id', 'order_items', ['product_id'], None),
+    ('ix_cart_items_cart_id_product_id_size', 'cart_items', ['cart_id', 'product_id', 'size'], None),
+    ('ix_cart_items_product_id', 'cart_items', ['product_id'], None),
+    ('ix_product_media_product_id', 'product_media', ['product_id'], None),
+    # Catalog listing (GET /products)
+    ('ix_products_is_active_is_archived_id', 'products', ['is_active', 'is_archived', 'id'], None),
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                unique=False,
+                if_not_exists=True,
+                postgresql_concurrently=True,
+                postgresql_where=sa.text(where) if where else None
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name=table,
+                if_exists=True,
+                postgresql_concurrently=True
+            )
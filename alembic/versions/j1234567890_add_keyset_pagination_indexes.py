@@ -0,0 +1,49 @@
+"""add_keyset_pagination_indexes
+
+Revision ID: j1234567890
+Revises: i1234567890
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'j1234567890'
+down_revision = 'i1234567890'
+branch_labels = None
+depends_on = None
+
+
+# (name, table, columns) - keyset pagination over (created_at, id)
+INDEXES = [
+    ('ix_products_listing_created_at_id', 'products', ['is_active', 'is_archived', 'created_at', 'id']),
+    ('ix_orders_created_at_id', 'orders', ['created_at', 'id']),
+    ('ix_users_created_at_id', 'users', ['created_at', 'id']),
+    ('ix_promo_codes_created_at_id', 'promo_codes', ['created_at', 'id']),
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                unique=False,
+                if_not_exists=True,
+                postgresql_concurrently=True
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name=table,
+                if_exists=True,
+                postgresql_concurrently=True
+            )
@@ -0,0 +1,46 @@
+"""add_media_url_indexes
+
+Revision ID: l1234567890
+Revises: k1234567890
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'l1234567890'
+down_revision = 'k1234567890'
+branch_labels = None
+depends_on = None
+
+
+# Media reference counting looks up product_media / products by file URL
+INDEXES = [
+    ('ix_product_media_url', 'product_media', ['url']),
+    ('ix_products_preview_image_url', 'products', ['preview_image_url']),
+]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                unique=False,
+                if_not_exists=True,
+                postgresql_concurrently=True
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name=table,
+                if_exists=True,
+                postgresql_concurrently=True
+            )
@@ -0,0 +1,58 @@
+"""unique_cart_items
+
+Revision ID: m1234567890
+Revises: l1234567890
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'm1234567890'
+down_revision = 'l1234567890'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Block concurrent cart writes until duplicates are merged and the constraint exists
+    op.execute("LOCK TABLE cart_items IN SHARE ROW EXCLUSIVE MODE")
+
+    # Merge duplicate rows into the oldest one, summing quantities
+    op.execute("""
+        UPDATE cart_items AS keep
+        SET quantity = dup.total_quantity
+        FROM (
+            SELECT min(id) AS id, sum(quantity) AS total_quantity
+            FROM cart_items
+            GROUP BY cart_id, product_id, size
+            HAVING count(*) > 1
+        ) AS dup
+        WHERE keep.id = dup.id
+    """)
+    op.execute("""
+        DELETE FROM cart_items AS extra
+        USING cart_items AS keep
+        WHERE extra.cart_id = keep.cart_id
+          AND extra.product_id = keep.product_id
+          AND extra.size = keep.size
+          AND extra.id > keep.id
+    """)
+
+    op.drop_index('ix_cart_items_cart_id_product_id_size', table_name='cart_items', if_exists=True)
+    op.create_unique_constraint(
+        'uq_cart_items_cart_id_product_id_size',
+        'cart_items',
+        ['cart_id', 'product_id', 'size']
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_cart_items_cart_id_product_id_size', 'cart_items', type_='unique')
+    op.create_index(
+        'ix_cart_items_cart_id_product_id_size',
+        'cart_items',
+        ['cart_id', 'product_id', 'size'],
+        unique=False
+    )
@@ -0,0 +1,55 @@
+"""add_stock_reservations
+
+Revision ID: n1234567890
+Revises: m1234567890
+Create Date: 2026-10-17 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'n1234567890'
+down_revision = 'm1234567890'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'stock_reservations',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('size', sa.String(length=50), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'product_id', 'size', name='uq_stock_reservations_user_id_product_id_size')
+    )
+    op.create_index(op.f('ix_stock_reservations_id'), 'stock_reservations', ['id'], unique=False)
+    op.create_index(op.f('ix_stock_reservations_product_id'), 'stock_reservations', ['product_id'], unique=False)
+    # Sweeper scans expired holds
+    op.create_index(op.f('ix_stock_reservations_expires_at'), 'stock_reservations', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    # Return outstanding holds to stock before dropping them
+    op.execute("""
+        UPDATE products AS p
+        SET oki_quantity = p.oki_quantity + held.oki,
+            big_quantity = p.big_quantity + held.big
+        FROM (
+            SELECT product_id,
+                   coalesce(sum(quantity) FILTER (WHERE size = 'OKI'), 0) AS oki,
+                   coalesce(sum(quantity) FILTER (WHERE size = 'BIG'), 0) AS big
+            FROM stock_reservations
+            GROUP BY product_id
+        ) AS held
+        WHERE p.id = held.product_id
+    """)
+    op.drop_table('stock_reservations')
@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.endpoints import auth, users, products, orders, promo_codes, pages, analytics, cart, splash, payment
+from app.api.endpoints import auth, users, products, orders, promo_codes, pages, analytics, cart, splash, payment, monitoring
 
 api_router = APIRouter()
 
@@ -14,3 +14,4 @@ api_router.include_router(splash.router, prefix="/splash", tags=["Splash Notific
 api_router.include_router(promo_codes.router, prefix="/promo-codes", tags=["Promo Codes"])
 api_router.include_router(pages.router, prefix="/pages", tags=["Pages"])
 api_router.include_router(analytics.router, prefix="/analytics", tags=["Analytics"])
+api_router.include_router(monitoring.router, prefix="/monitoring", tags=["Monitoring"])
@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import func, and_
 from datetime import datetime, timedelta
 from typing import Optional
@@ -8,7 +8,7 @@ import io
 
 from fastapi.responses import StreamingResponse
 
-from app.core.database import get_db
+from app.core.replica import get_read_db
 from app.core.security import get_current_admin
 from app.models.order import Order, OrderItem, OrderStatus, PaymentStatus
 from app.models.user import User
@@ -21,7 +21,7 @@ router = APIRouter()
 async def get_sales_statistics(
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_admin = Depends(get_current_admin)
 ):
     """
@@ -78,7 +78,7 @@ async def get_sales_statistics(
 async def get_preorders_statistics(
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_admin = Depends(get_current_admin)
 ):
     """
@@ -125,7 +125,7 @@ async def get_preorders_statistics(
 
 @router.get("/customers")
 async def get_customers_statistics(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_admin = Depends(get_current_admin)
 ):
     """
@@ -150,7 +150,7 @@ async def get_customers_statistics(
 
 @router.get("/promo-codes")
 async def get_promo_codes_statistics(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_admin = Depends(get_current_admin)
 ):
     """
@@ -178,7 +178,7 @@ async def get_promo_codes_statistics(
 
 @router.get("/export/customers")
 async def export_customers(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_admin = Depends(get_current_admin)
 ):
     """
@@ -225,13 +225,13 @@ async def export_customers(
 async def export_orders(
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_admin = Depends(get_current_admin)
 ):
     """
     Экспорт заказов в CSV
     """
-    query = db.query(Order)
+    query = db.query(Order).options(joinedload(Order.user))
     
     if start_date:
         query = query.filter(Order.created_at >= start_date)
@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_db
-from app.core.security import create_access_token, verify_password, get_password_hash
+from app.core.database import get_async_db
+from app.core.security import create_access_token, get_password_hash_async, verify_and_update_password
 from app.models.user import User
 from app.schemas.user import UserCreate, UserLogin, Token, UserResponse
 
@@ -10,12 +11,13 @@ router = APIRouter()
 
 
 @router.post("/register", response_model=Token, status_code=status.HTTP_201_CREATED)
-async def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """
     Регистрация нового пользователя
     """
     # Check if user exists
-    existing_user = db.query(User).filter(User.phone == user_data.phone).first()
+    result = await db.execute(select(User).where(User.phone == user_data.phone))
+    existing_user = result.scalars().first()
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -25,16 +27,16 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     # Create new user
     new_user = User(
         phone=user_data.phone,
-        password_hash=get_password_hash(user_data.password),
+        password_hash=await get_password_hash_async(user_data.password),
         is_admin=False
     )
     
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     
     # Create access token
-    access_token = create_access_token(data={"sub": new_user.id})
+    access_token = create_access_token(data={"sub": str(new_user.id)})
     
     return Token(
         access_token=access_token,
@@ -44,14 +46,22 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
 
 
 @router.post("/login", response_model=Token)
-async def login(credentials: UserLogin, db: Session = Depends(get_db)):
+async def login(credentials: UserLogin, db: AsyncSession = Depends(get_async_db)):
     """
     Вход пользователя
     """
     # Find user
-    user = db.query(User).filter(User.phone == credentials.phone).first()
+    result = await db.execute(select(User).where(User.phone == credentials.phone))
+    user = result.scalars().first()
     
-    if not user or not verify_password(credentials.password, user.password_hash):
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Неверный номер телефона или пароль"
+        )
+    
+    is_valid, new_hash = await verify_and_update_password(credentials.password, user.password_hash)
+    if not is_valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Неверный номер телефона или пароль"
@@ -63,6 +73,11 @@ async def login(credentials: UserLogin, db: Session = Depends(get_db)):
             detail="Аккаунт деактивирован"
         )
     
+    # Rehash password if cost factor changed
+    if new_hash:
+        user.password_hash = new_hash
+        await db.commit()
+    
     # Create access token
     access_token = create_access_token(data={"sub": str(user.id)})
     
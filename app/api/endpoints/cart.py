@@ -1,118 +1,191 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session, joinedload
-from typing import List
-
-from app.core.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy import select, delete, literal, tuple_, case, func, and_, or_, not_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime
+
+from app.core.config import settings
+from app.core.database import get_async_db
+from app.core.replica import get_async_read_db
 from app.core.security import get_current_user
 from app.models.user import User
 from app.models.cart import Cart, CartItem
-from app.models.product import Product
+from app.models.product import Product, OrderType
+from app.models.reservation import StockReservation
 from app.schemas.cart import (
     CartWithProductsResponse,
     CartItemCreate,
     CartItemUpdate,
-    CartItemWithProductResponse
+    CartItemWithProductResponse,
+    CartBatchRequest,
+    CartSummaryLine,
+    CartSummaryResponse
 )
+from app.services.cart_serializer import cart_item_response, cart_response
+from app.services.catalog_cache import catalog_cache
+from app.services.reservations import ReservationError, release_holds, set_holds
+from app.utils.http_cache import CACHE_CONTROL_PRIVATE, conditional_json_response
 
 router = APIRouter()
 
 
-def get_or_create_cart(user_id: int, db: Session) -> Cart:
+def upsert_cart_id(user_id: int, now: datetime):
+    """CTE с id корзины пользователя; корзина создаётся, если её нет (ON CONFLICT по carts.user_id)"""
+    return (
+        pg_insert(Cart)
+        .values(user_id=user_id, created_at=now, updated_at=now)
+        .on_conflict_do_update(index_elements=[Cart.user_id], set_={"updated_at": now})
+        .returning(Cart.id)
+        .cte("cart")
+    )
+
+
+async def get_or_create_cart(user_id: int, db: AsyncSession) -> Cart:
     """Получить или создать корзину для пользователя"""
-    cart = db.query(Cart).filter(Cart.user_id == user_id).first()
+    result = await db.execute(select(Cart).where(Cart.user_id == user_id))
+    cart = result.scalars().first()
     if not cart:
-        cart = Cart(user_id=user_id)
-        db.add(cart)
-        db.commit()
-        db.refresh(cart)
+        cart_id = await db.scalar(select(upsert_cart_id(user_id, datetime.utcnow()).c.id))
+        await db.commit()
+        cart = await db.get(Cart, cart_id, options=[selectinload(Cart.items)])
     return cart
 
 
+async def load_cart(user_id: int, db: AsyncSession) -> Optional[Cart]:
+    """Корзина пользователя с позициями, товарами и их медиа"""
+    result = await db.execute(
+        select(Cart).options(
+            selectinload(Cart.items).joinedload(CartItem.product).selectinload(Product.media)
+        ).where(Cart.user_id == user_id).execution_options(populate_existing=True)
+    )
+    return result.scalars().first()
+
+
+async def reload_product(product_id: int, db: AsyncSession) -> Product:
+    """Перечитать товар с медиа: резервы меняют остатки в SQL, мимо загруженного объекта"""
+    return await db.get(Product, product_id, options=[selectinload(Product.media)], populate_existing=True)
+
+
+def holds_stock(product: Product) -> bool:
+    """Позиции этого товара резервируют остаток (режим резервирования, не предзаказ)"""
+    return settings.STOCK_RESERVATIONS_ENABLED and product.order_type == OrderType.ORDER
+
+
 @router.get("/", response_model=CartWithProductsResponse)
 async def get_cart(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получить корзину текущего пользователя
     """
-    cart = db.query(Cart).options(
-        joinedload(Cart.items).joinedload(CartItem.product)
-    ).filter(Cart.user_id == current_user.id).first()
+    cart = await load_cart(current_user.id, db)
 
     if not cart:
         # Создать корзину в БД
-        cart = get_or_create_cart(current_user.id, db)
-
-    # Рассчитать итоги
-    total_items = sum(item.quantity for item in cart.items)
-    total_amount = sum(item.quantity * item.product.price for item in cart.items)
-
-    # Подготовить данные для ответа
-    response_data = {
-        "id": cart.id,
-        "user_id": cart.user_id,
-        "created_at": cart.created_at,
-        "updated_at": cart.updated_at,
-        "items": [
-            {
-                "id": item.id,
-                "product_id": item.product_id,
-                "size": item.size,
-                "quantity": item.quantity,
-                "created_at": item.created_at,
-                "product_name": item.product.name,
-                "product_price": item.product.price,
-                "product_article": item.product.article,
-                "product": {
-                    "id": item.product.id,
-                    "name": item.product.name,
-                    "description": item.product.description,
-                    "article": item.product.article,
-                    "price": item.product.price,
-                    "sizes": item.product.sizes,
-                    "size_table": item.product.size_table,
-                    "care_instructions": item.product.care_instructions,
-                    "preview_image_url": item.product.preview_image_url,
-                    "order_type": item.product.order_type.value,
-                    "stock_count": item.product.stock_count,
-                    "preorder_waves_total": item.product.preorder_waves_total,
-                    "preorder_wave_capacity": item.product.preorder_wave_capacity,
-                    "current_wave": item.product.current_wave,
-                    "current_wave_count": item.product.current_wave_count,
-                    "is_active": item.product.is_active,
-                    "is_archived": item.product.is_archived,
-                    "created_at": item.product.created_at,
-                    "updated_at": item.product.updated_at,
-                    "media": [
-                        {
-                            "url": media.url,
-                            "order": media.order,
-                            "id": media.id,
-                            "created_at": media.created_at
-                        } for media in item.product.media
-                    ]
-                }
-            } for item in cart.items
-        ],
-        "total_items": total_items,
-        "total_amount": total_amount
-    }
+        cart = await get_or_create_cart(current_user.id, db)
+
+    return cart_response(cart)
+
+
+def cart_summary_query(user_id: int):
+    """
+    Позиции корзины с доступностью и итогами (оконными функциями) одним запросом
+
+    С резервированием остаток товара уже уменьшен на резерв самого пользователя:
+    доступное количество позиции - остаток плюс её резерв.
+    """
+    available_quantity = case(
+        (CartItem.size == "OKI", Product.oki_quantity),
+        (CartItem.size == "BIG", Product.big_quantity),
+        else_=0
+    )
+    if settings.STOCK_RESERVATIONS_ENABLED:
+        available_quantity = available_quantity + func.coalesce(StockReservation.quantity, 0)
+    is_available = and_(
+        Product.is_active.is_(True),
+        Product.is_archived.is_not(True),
+        or_(
+            and_(
+                Product.order_type == OrderType.PREORDER,
+                Product.current_wave <= Product.preorder_waves_total
+            ),
+            and_(
+                Product.order_type == OrderType.ORDER,
+                available_quantity >= CartItem.quantity
+            )
+        )
+    )
+    line_amount = CartItem.quantity * Product.price
+    query = (
+        select(
+            CartItem.id.label("item_id"),
+            CartItem.product_id,
+            CartItem.size,
+            CartItem.quantity,
+            Product.price,
+            case((Product.order_type == OrderType.PREORDER, None), else_=available_quantity).label("available_quantity"),
+            is_available.label("is_available"),
+            func.sum(CartItem.quantity).over().label("total_items"),
+            func.sum(line_amount).over().label("total_amount"),
+            func.bool_or(not_(is_available)).over().label("has_unavailable")
+        )
+        .join(Cart, Cart.id == CartItem.cart_id)
+        .join(Product, Product.id == CartItem.product_id)
+        .where(Cart.user_id == user_id)
+        .order_by(CartItem.created_at, CartItem.id)
+    )
+    if settings.STOCK_RESERVATIONS_ENABLED:
+        query = query.outerjoin(
+            StockReservation,
+            and_(
+                StockReservation.user_id == Cart.user_id,
+                StockReservation.product_id == CartItem.product_id,
+                StockReservation.size == CartItem.size
+            )
+        )
+    return query
 
-    return CartWithProductsResponse(**response_data)
+
+@router.get("/summary", response_model=CartSummaryResponse)
+async def get_cart_summary(
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    Сводка корзины: количество, сумма и доступность позиций одним запросом
+    """
+    result = await db.execute(cart_summary_query(current_user.id))
+    rows = result.all()
+    totals = rows[0]._mapping if rows else {}
+
+    summary = CartSummaryResponse(
+        lines_count=len(rows),
+        total_items=totals.get("total_items", 0),
+        total_amount=totals.get("total_amount", 0.0),
+        has_unavailable=totals.get("has_unavailable", False),
+        lines=[CartSummaryLine.model_validate(row, from_attributes=True) for row in rows]
+    )
+
+    # Опрашивается на каждой странице: 304, пока корзина не изменилась
+    payload = summary.model_dump_json().encode()
+    return conditional_json_response(request, payload, CACHE_CONTROL_PRIVATE)
 
 
 @router.post("/items", response_model=CartItemWithProductResponse, status_code=status.HTTP_201_CREATED)
 async def add_item_to_cart(
     item_data: CartItemCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Добавить товар в корзину
     """
     # Проверить продукт
-    product = db.query(Product).filter(Product.id == item_data.product_id).first()
+    product = await db.get(Product, item_data.product_id, options=[selectinload(Product.media)])
     if not product:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -139,76 +212,165 @@ async def add_item_to_cart(
             detail=f"Недостаточно товара размера {item_data.size} на складе"
         )
 
-    # Получить или создать корзину
-    cart = get_or_create_cart(current_user.id, db)
-
-    # Проверить, есть ли уже такой товар в корзине
-    existing_item = db.query(CartItem).filter(
-        CartItem.cart_id == cart.id,
-        CartItem.product_id == item_data.product_id,
-        CartItem.size == item_data.size
-    ).first()
-
-    if existing_item:
-        # Обновить количество
-        existing_item.quantity += item_data.quantity
-        db.commit()
-        db.refresh(existing_item)
-        item = existing_item
-    else:
-        # Создать новый элемент
-        item = CartItem(
-            cart_id=cart.id,
-            product_id=item_data.product_id,
-            size=item_data.size,
-            quantity=item_data.quantity
+    # Одним запросом: корзина (создаётся при необходимости) и позиция
+    # (количество суммируется при повторном добавлении, безопасно при параллельных запросах)
+    now = datetime.utcnow()
+    cart_id = upsert_cart_id(current_user.id, now)
+    item_insert = pg_insert(CartItem).from_select(
+        ["cart_id", "product_id", "size", "quantity", "created_at"],
+        select(
+            cart_id.c.id,
+            literal(item_data.product_id),
+            literal(item_data.size),
+            literal(item_data.quantity),
+            literal(now)
+        )
+    )
+    result = await db.execute(
+        item_insert.on_conflict_do_update(
+            constraint="uq_cart_items_cart_id_product_id_size",
+            set_={"quantity": CartItem.quantity + item_insert.excluded.quantity}
+        ).returning(CartItem.id, CartItem.product_id, CartItem.size, CartItem.quantity, CartItem.created_at)
+    )
+    item = result.one()
+
+    # Зарезервировать остаток под всю позицию (с продлением срока резерва)
+    changed_products = set()
+    if holds_stock(product):
+        try:
+            changed_products = await set_holds(db, current_user.id, {(item.product_id, item.size): item.quantity})
+        except ReservationError:
+            await db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Недостаточно товара размера {item_data.size} на складе"
+            )
+    await db.commit()
+    if changed_products:
+        catalog_cache.invalidate_products(changed_products)
+        product = await reload_product(product.id, db)
+
+    return cart_item_response(item, product, status_code=status.HTTP_201_CREATED)
+
+
+@router.post("/items/batch", response_model=CartWithProductsResponse)
+async def batch_update_cart(
+    batch: CartBatchRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Пакетное изменение корзины: add / update / remove по товару и размеру
+
+    Все операции проверяются заранее и применяются в одной транзакции:
+    либо все, либо ни одной.
+    """
+    # Свести операции к итоговому изменению каждой позиции (в порядке запроса):
+    # ("add", n) - прибавить к текущему количеству, ("set", n) - установить, ("remove", 0) - удалить
+    changes: Dict[Tuple[int, str], Tuple[str, int]] = {}
+    for operation in batch.operations:
+        key = (operation.product_id, operation.size)
+        kind, quantity = changes.get(key, ("add", 0))
+        if operation.action == "remove":
+            changes[key] = ("remove", 0)
+        elif operation.action == "update":
+            changes[key] = ("set", operation.quantity)
+        elif kind == "add":
+            changes[key] = ("add", quantity + operation.quantity)
+        else:
+            # add после update/remove: количество известно
+            changes[key] = ("set", quantity + operation.quantity)
+
+    # Проверить все товары одним запросом
+    product_ids = {product_id for (product_id, _), (kind, _) in changes.items() if kind != "remove"}
+    products = {}
+    if product_ids:
+        result = await db.execute(select(Product).where(Product.id.in_(product_ids)))
+        products = {product.id: product for product in result.scalars()}
+
+    errors = []
+    for (product_id, size), (kind, quantity) in changes.items():
+        if kind == "remove":
+            continue
+        product = products.get(product_id)
+        if not product:
+            errors.append(f"Товар {product_id} не найден")
+        elif not product.is_active:
+            errors.append(f"Товар {product.name} недоступен")
+        elif product.order_type.value != 'preorder' and size not in product.sizes:
+            errors.append(f"Размер {size} недоступен для товара {product.name}")
+        elif product.order_type.value != 'preorder' and not holds_stock(product) and product.sizes[size] < quantity:
+            # С резервированием остаток (без уже отложенного) проверяет set_holds
+            errors.append(f"Недостаточно товара {product.name} размера {size} на складе")
+    if errors:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="; ".join(errors)
         )
-        db.add(item)
-        db.commit()
-        db.refresh(item)
-
-    # Подготовить данные для ответа
-    response_data = {
-        "id": item.id,
-        "product_id": item.product_id,
-        "size": item.size,
-        "quantity": item.quantity,
-        "created_at": item.created_at,
-        "product_name": product.name,
-        "product_price": product.price,
-        "product_article": product.article,
-        "product": {
-            "id": product.id,
-            "name": product.name,
-            "description": product.description,
-            "article": product.article,
-            "price": product.price,
-            "sizes": product.sizes,
-            "size_table": product.size_table,
-            "care_instructions": product.care_instructions,
-            "preview_image_url": product.preview_image_url,
-            "order_type": product.order_type.value,
-            "stock_count": product.stock_count,
-            "preorder_waves_total": product.preorder_waves_total,
-            "preorder_wave_capacity": product.preorder_wave_capacity,
-            "current_wave": product.current_wave,
-            "current_wave_count": product.current_wave_count,
-            "is_active": product.is_active,
-            "is_archived": product.is_archived,
-            "created_at": product.created_at,
-            "updated_at": product.updated_at,
-            "media": [
-                {
-                    "url": media.url,
-                    "order": media.order,
-                    "id": media.id,
-                    "created_at": media.created_at
-                } for media in product.media
-            ]
-        }
-    }
 
-    return CartItemWithProductResponse(**response_data)
+    now = datetime.utcnow()
+    cart_id = await db.scalar(select(upsert_cart_id(current_user.id, now).c.id))
+
+    changed_products = set()
+    removed = [key for key, (kind, _) in changes.items() if kind == "remove"]
+    if removed:
+        await db.execute(
+            delete(CartItem).where(
+                CartItem.cart_id == cart_id,
+                tuple_(CartItem.product_id, CartItem.size).in_(removed)
+            )
+        )
+        if settings.STOCK_RESERVATIONS_ENABLED:
+            changed_products |= await release_holds(db, current_user.id, removed)
+
+    # Одна вставка на тип изменения: прибавить к количеству или установить его
+    line_quantities: Dict[Tuple[int, str], int] = {}
+    for kind, quantity_on_conflict in (
+        ("add", lambda stmt: CartItem.quantity + stmt.excluded.quantity),
+        ("set", lambda stmt: stmt.excluded.quantity),
+    ):
+        rows = [
+            {
+                "cart_id": cart_id,
+                "product_id": product_id,
+                "size": size,
+                "quantity": quantity,
+                "created_at": now
+            }
+            for (product_id, size), (change_kind, quantity) in changes.items()
+            if change_kind == kind
+        ]
+        if rows:
+            stmt = pg_insert(CartItem).values(rows)
+            result = await db.execute(stmt.on_conflict_do_update(
+                constraint="uq_cart_items_cart_id_product_id_size",
+                set_={"quantity": quantity_on_conflict(stmt)}
+            ).returning(CartItem.product_id, CartItem.size, CartItem.quantity))
+            line_quantities.update({(row.product_id, row.size): row.quantity for row in result})
+
+    # Резервы под итоговые количества всех изменённых позиций - одним набором запросов
+    targets = {
+        key: quantity for key, quantity in line_quantities.items()
+        if holds_stock(products[key[0]])
+    }
+    if targets:
+        try:
+            changed_products |= await set_holds(db, current_user.id, targets)
+        except ReservationError as e:
+            detail = "; ".join(
+                f"Недостаточно товара {products[product_id].name} на складе" for product_id in e.product_ids
+            )
+            await db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=detail
+            )
+
+    await db.commit()
+    if changed_products:
+        catalog_cache.invalidate_products(changed_products)
+
+    return cart_response(await load_cart(current_user.id, db))
 
 
 @router.put("/items/{item_id}", response_model=CartItemWithProductResponse)
@@ -216,15 +378,18 @@ async def update_cart_item(
     item_id: int,
     item_data: CartItemUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Обновить количество товара в корзине
     """
-    item = db.query(CartItem).options(
-        joinedload(CartItem.cart),
-        joinedload(CartItem.product)
-    ).filter(CartItem.id == item_id).first()
+    result = await db.execute(
+        select(CartItem).options(
+            joinedload(CartItem.cart),
+            joinedload(CartItem.product).selectinload(Product.media)
+        ).where(CartItem.id == item_id)
+    )
+    item = result.scalars().first()
 
     if not item:
         raise HTTPException(
@@ -240,65 +405,41 @@ async def update_cart_item(
         )
 
     item.quantity = item_data.quantity
-    db.commit()
-    db.refresh(item)
-
-    # Подготовить данные для ответа
-    response_data = {
-        "id": item.id,
-        "product_id": item.product_id,
-        "size": item.size,
-        "quantity": item.quantity,
-        "created_at": item.created_at,
-        "product_name": item.product.name,
-        "product_price": item.product.price,
-        "product_article": item.product.article,
-        "product": {
-            "id": item.product.id,
-            "name": item.product.name,
-            "description": item.product.description,
-            "article": item.product.article,
-            "price": item.product.price,
-            "sizes": item.product.sizes,
-            "size_table": item.product.size_table,
-            "care_instructions": item.product.care_instructions,
-            "preview_image_url": item.product.preview_image_url,
-            "order_type": item.product.order_type.value,
-            "stock_count": item.product.stock_count,
-            "preorder_waves_total": item.product.preorder_waves_total,
-            "preorder_wave_capacity": item.product.preorder_wave_capacity,
-            "current_wave": item.product.current_wave,
-            "current_wave_count": item.product.current_wave_count,
-            "is_active": item.product.is_active,
-            "is_archived": item.product.is_archived,
-            "created_at": item.product.created_at,
-            "updated_at": item.product.updated_at,
-            "media": [
-                {
-                    "url": media.url,
-                    "order": media.order,
-                    "id": media.id,
-                    "created_at": media.created_at
-                } for media in item.product.media
-            ]
-        }
-    }
 
-    return CartItemWithProductResponse(**response_data)
+    changed_products = set()
+    if holds_stock(item.product):
+        size = item.size
+        try:
+            changed_products = await set_holds(db, current_user.id, {(item.product_id, size): item_data.quantity})
+        except ReservationError:
+            await db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Недостаточно товара размера {size} на складе"
+            )
+    await db.commit()
+    if changed_products:
+        catalog_cache.invalidate_products(changed_products)
+        await reload_product(item.product_id, db)
+
+    return cart_item_response(item, item.product)
 
 
 @router.delete("/items/{item_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def remove_item_from_cart(
     item_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Удалить товар из корзины
     """
-    item = db.query(CartItem).options(
-        joinedload(CartItem.cart)
-    ).filter(CartItem.id == item_id).first()
+    result = await db.execute(
+        select(CartItem).options(
+            joinedload(CartItem.cart)
+        ).where(CartItem.id == item_id)
+    )
+    item = result.scalars().first()
 
     if not item:
         raise HTTPException(
@@ -313,19 +454,29 @@ async def remove_item_from_cart(
             detail="Доступ запрещён"
         )
 
-    db.delete(item)
-    db.commit()
+    await db.delete(item)
+    changed_products = set()
+    if settings.STOCK_RESERVATIONS_ENABLED:
+        changed_products = await release_holds(db, current_user.id, [(item.product_id, item.size)])
+    await db.commit()
+    if changed_products:
+        catalog_cache.invalidate_products(changed_products)
 
 
 @router.delete("/", status_code=status.HTTP_204_NO_CONTENT)
 async def clear_cart(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Очистить корзину
     """
-    cart = db.query(Cart).filter(Cart.user_id == current_user.id).first()
-    if cart:
-        db.query(CartItem).filter(CartItem.cart_id == cart.id).delete()
-        db.commit()
\ No newline at end of file
+    cart_id = await db.scalar(select(Cart.id).where(Cart.user_id == current_user.id))
+    if cart_id:
+        await db.execute(delete(CartItem).where(CartItem.cart_id == cart_id))
+        changed_products = set()
+        if settings.STOCK_RESERVATIONS_ENABLED:
+            changed_products = await release_holds(db, current_user.id)
+        await db.commit()
+        if changed_products:
+            catalog_cache.invalidate_products(changed_products)
\ No newline at end of file
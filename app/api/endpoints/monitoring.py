@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Depends
+
+from app.core.config import settings
+from app.core.database import get_pool_statistics
+from app.core.security import get_current_admin, user_cache
+from app.services.cart_serializer import product_fragments
+from app.services.catalog_cache import catalog_cache
+
+router = APIRouter()
+
+
+@router.get("/db-pool")
+async def get_db_pool_statistics(
+    current_admin = Depends(get_current_admin)
+):
+    """
+    Статистика пулов соединений с БД текущего воркера (только для администраторов)
+    """
+    return {
+        "settings": {
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "pool_timeout": settings.DB_POOL_TIMEOUT,
+            "pool_recycle": settings.DB_POOL_RECYCLE,
+        },
+        "pools": get_pool_statistics()
+    }
+
+
+@router.get("/caches")
+async def get_cache_statistics(
+    current_admin = Depends(get_current_admin)
+):
+    """
+    Статистика in-process кэшей текущего воркера (только для администраторов)
+    """
+    return {
+        "catalog": catalog_cache.stats(),
+        "cart_products": product_fragments.stats(),
+        "users": user_cache.stats()
+    }
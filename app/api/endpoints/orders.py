@@ -1,11 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from sqlalchemy.orm.attributes import flag_modified
 from typing import Optional, List
 from datetime import datetime
 import uuid
 
-from app.core.database import get_db
+from app.core.config import settings
+from app.core.database import get_async_db
 from app.core.security import get_current_user, get_current_admin
 from app.models.user import User
 from app.models.order import Order, OrderItem, OrderStatus
@@ -13,35 +16,79 @@ from app.models.product import Product, OrderType
 from app.models.promo_code import PromoCode
 from app.models.cart import Cart, CartItem
 from app.schemas.order import OrderCreate, OrderUpdate, OrderResponse, OrderListResponse, BulkPreorderStatusUpdate
+from app.services.catalog_cache import catalog_cache
+from app.services.reservations import ReservationError, convert_holds
+from app.utils.http_cache import CACHE_CONTROL_PRIVATE, conditional_json_response
+from app.utils.counting import TOTAL_MODE_DESCRIPTION, TotalMode, count_total, invalidate_counts
+from app.utils.pagination import apply_keyset, split_page
 
 router = APIRouter()
 
+# Eager loading for OrderResponse (lazy loading is not allowed with AsyncSession)
+order_items_loader = selectinload(Order.items).selectinload(OrderItem.product).selectinload(Product.media)
+
+
+async def get_orders_with_items(order_ids: List[int], db: AsyncSession) -> List[Order]:
+    """Загрузить заказы вместе с позициями и товарами"""
+    result = await db.execute(
+        select(Order)
+        .options(order_items_loader)
+        .where(Order.id.in_(order_ids))
+        .execution_options(populate_existing=True)
+    )
+    orders = {order.id: order for order in result.scalars().all()}
+    return [orders[order_id] for order_id in order_ids if order_id in orders]
+
+
+def user_orders_query(user_id: int):
+    """Заказы пользователя (история заказов)"""
+    return select(Order).where(Order.user_id == user_id)
+
+
+def admin_orders_query(status: Optional[str]):
+    """Все заказы, с фильтром по статусу"""
+    query = select(Order)
+    if status:
+        query = query.where(Order.status == status)
+    return query
+
+
+def orders_page_query(query, cursor: Optional[str], skip: int, limit: int):
+    """Страница заказов с позициями: новые первыми, по курсору или skip"""
+    page_query = apply_keyset(query.options(order_items_loader), Order, cursor, limit, descending=True)
+    if cursor is None:
+        page_query = page_query.offset(skip)
+    return page_query
+
 
 @router.get("/", response_model=OrderListResponse)
 async def get_orders(
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы (вместо skip, без подсчёта total)"),
+    total_mode: TotalMode = Query("exact", description=TOTAL_MODE_DESCRIPTION),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получить заказы текущего пользователя
     """
-    from sqlalchemy.orm import joinedload
+    query = user_orders_query(current_user.id)
     
-    query = db.query(Order).filter(Order.user_id == current_user.id)
-    
-    total = query.count()
+    total, total_estimated = None, False
+    if cursor is None:
+        total, total_estimated = await count_total(db, query, "orders", total_mode)
     # Use eager loading to avoid N+1 problem
-    orders = query.options(
-        joinedload(Order.items).joinedload(OrderItem.product)
-    ).order_by(Order.created_at.desc()).offset(skip).limit(limit).all()
+    result = await db.execute(orders_page_query(query, cursor, skip, limit))
+    orders, next_cursor = split_page(result.scalars().all(), limit)
     
     return OrderListResponse(
         orders=orders,
         total=total,
-        page=skip // limit + 1,
-        page_size=limit
+        total_estimated=total_estimated,
+        page=skip // limit + 1 if cursor is None else None,
+        page_size=limit,
+        next_cursor=next_cursor
     )
 
 
@@ -49,7 +96,7 @@ async def get_orders(
 async def bulk_update_production_status(
     product_ids: List[int],
     status: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_admin: User = Depends(get_current_admin)
 ):
     """
@@ -64,7 +111,8 @@ async def bulk_update_production_status(
         )
 
     # Проверяем, что все указанные товары существуют и являются предзаказами
-    products = db.query(Product).filter(Product.id.in_(product_ids)).all()
+    result = await db.execute(select(Product).where(Product.id.in_(product_ids)))
+    products = result.scalars().all()
 
     if len(products) != len(product_ids):
         raise HTTPException(
@@ -90,7 +138,8 @@ async def bulk_update_production_status(
         product.production_status = ProductionStatus(status)
         updated_count += 1
 
-    db.commit()
+    await db.commit()
+    catalog_cache.invalidate_products(product_ids)
 
     return {
         "message": f"Статусы производства {updated_count} товаров успешно обновлены",
@@ -101,17 +150,17 @@ async def bulk_update_production_status(
 @router.get("/{order_id}", response_model=OrderResponse)
 async def get_order(
     order_id: int,
+    request: Request,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получить заказ по ID
     """
-    from sqlalchemy.orm import joinedload
-    
-    order = db.query(Order).options(
-        joinedload(Order.items).joinedload(OrderItem.product)
-    ).filter(Order.id == order_id).first()
+    result = await db.execute(
+        select(Order).options(order_items_loader).where(Order.id == order_id)
+    )
+    order = result.scalars().first()
     
     if not order:
         raise HTTPException(
@@ -126,27 +175,27 @@ async def get_order(
             detail="Доступ запрещён"
         )
     
-    return order
+    # Order body embeds product data, so ETag is a content hash
+    payload = OrderResponse.model_validate(order).model_dump_json().encode()
+    return conditional_json_response(request, payload, CACHE_CONTROL_PRIVATE)
 
 
 @router.post("/", response_model=List[OrderResponse], status_code=status.HTTP_201_CREATED)
 async def create_order(
     order_data: OrderCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Создать новый заказ (или заказы, если есть товары с разными типами)
     """
-    from sqlalchemy import select
-    from sqlalchemy.orm import joinedload
-
     # Получить корзину пользователя
     cart = None
     if order_data.from_cart:
-        cart = db.query(Cart).options(
-            joinedload(Cart.items).joinedload(CartItem.product)
-        ).filter(Cart.user_id == current_user.id).first()
+        result = await db.execute(
+            select(Cart).options(selectinload(Cart.items)).where(Cart.user_id == current_user.id)
+        )
+        cart = result.scalars().first()
 
         if not cart or not cart.items:
             raise HTTPException(
@@ -154,6 +203,10 @@ async def create_order(
                 detail="Корзина пуста"
             )
 
+    # С резервированием остаток обычных товаров уже отложен корзиной:
+    # строки товаров не блокируются, резервы конвертируются ниже
+    use_holds = settings.STOCK_RESERVATIONS_ENABLED
+
     order_items_data = []
     items_to_process = cart.items if order_data.from_cart else order_data.items
 
@@ -170,8 +223,12 @@ async def create_order(
             size = item_data.size
             quantity = item_data.quantity
 
-        # Use SELECT FOR UPDATE to lock row and prevent race conditions
-        product = db.query(Product).filter(Product.id == product_id).with_for_update().first()
+        # Use SELECT FOR UPDATE to lock row and prevent race conditions (not needed with holds)
+        query = select(Product).where(Product.id == product_id)
+        if not use_holds:
+            query = query.with_for_update()
+        result = await db.execute(query)
+        product = result.scalars().first()
 
         if not product:
             raise HTTPException(
@@ -196,6 +253,10 @@ async def create_order(
         preorder_wave = None
 
         if is_preorder:
+            if use_holds:
+                # Wave counters are still updated in place: lock the row
+                await db.refresh(product, with_for_update=True)
+
             # Check preorder availability
             if product.current_wave > product.preorder_waves_total:
                 raise HTTPException(
@@ -203,7 +264,12 @@ async def create_order(
                     detail=f"Все волны предзаказа для {product.name} заполнены"
                 )
             preorder_wave = product.current_wave
-        else:
+        elif size not in ["OKI", "BIG"]:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Неверный размер {size}"
+            )
+        elif not use_holds:
             # Check stock for specific size
             if size == "OKI" and product.oki_quantity < quantity:
                 raise HTTPException(
@@ -215,11 +281,6 @@ async def create_order(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail=f"Недостаточно товара {product.name} размера {size} на складе"
                 )
-            elif size not in ["OKI", "BIG"]:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Неверный размер {size}"
-                )
 
         order_items_data.append({
             "product": product,
@@ -234,10 +295,25 @@ async def create_order(
     preorder_items = [item for item in order_items_data if item["is_preorder"]]
     order_items = [item for item in order_items_data if not item["is_preorder"]]
 
+    if use_holds and order_items:
+        # Резервы покрывают заказ; недостающее (резерв истёк) берётся из остатка одним UPDATE
+        needed = {}
+        for item in order_items:
+            key = (item["product"].id, item["size"])
+            needed[key] = needed.get(key, 0) + item["quantity"]
+        try:
+            await convert_holds(db, current_user.id, needed)
+        except ReservationError as e:
+            names = {item["product"].id: item["product"].name for item in order_items}
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="; ".join(f"Недостаточно товара {names[product_id]} на складе" for product_id in e.product_ids)
+            )
+
     created_orders = []
 
     # Функция для создания заказа
-    def create_single_order(items, is_preorder_type):
+    async def create_single_order(items, is_preorder_type):
         if not items:
             return None
 
@@ -248,9 +324,10 @@ async def create_order(
         promo_code = None
 
         if not is_preorder_type and order_data.promo_code:
-            promo_code = db.query(PromoCode).filter(
-                PromoCode.code == order_data.promo_code
-            ).first()
+            result = await db.execute(
+                select(PromoCode).where(PromoCode.code == order_data.promo_code)
+            )
+            promo_code = result.scalars().first()
 
             if promo_code and promo_code.is_valid():
                 if promo_code.discount_percent > 0:
@@ -277,9 +354,9 @@ async def create_order(
             promo_code_id=promo_code.id if promo_code else None
         )
 
+        # Flush (not commit) to get order.id while keeping product rows locked
         db.add(order)
-        db.commit()
-        db.refresh(order)
+        await db.flush()
 
         # Create order items
         for item_data in items:
@@ -307,7 +384,7 @@ async def create_order(
                     # Check if all waves are done
                     if product.current_wave > product.preorder_waves_total:
                         product.order_type = OrderType.WAITING
-            else:
+            elif not use_holds:
                 # Decrease stock for regular orders immediately
                 size = item_data["size"]
                 if size == "OKI":
@@ -319,42 +396,44 @@ async def create_order(
         if promo_code:
             promo_code.current_uses += 1
 
-        db.commit()
-        db.refresh(order)
+        await db.flush()
         return order
 
     # Создать заказ для обычных товаров
     if order_items:
-        order = create_single_order(order_items, False)
+        order = await create_single_order(order_items, False)
         if order:
             created_orders.append(order)
 
     # Создать заказ для предзаказов
     if preorder_items:
-        preorder_order = create_single_order(preorder_items, True)
+        preorder_order = await create_single_order(preorder_items, True)
         if preorder_order:
             created_orders.append(preorder_order)
 
     # Очистить корзину, если заказ создан из корзины
     if order_data.from_cart and cart:
-        db.query(CartItem).filter(CartItem.cart_id == cart.id).delete()
+        await db.execute(delete(CartItem).where(CartItem.cart_id == cart.id))
 
-    db.commit()
+    await db.commit()
+    invalidate_counts("orders")
+    # Stock / preorder wave counters changed
+    catalog_cache.invalidate_products({item["product"].id for item in order_items_data})
 
-    return created_orders
+    return await get_orders_with_items([order.id for order in created_orders], db)
 
 
 @router.patch("/{order_id}", response_model=OrderResponse)
 async def update_order(
     order_id: int,
     order_data: OrderUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_admin: User = Depends(get_current_admin)
 ):
     """
     Частично обновить заказ (только для администраторов)
     """
-    order = db.query(Order).filter(Order.id == order_id).first()
+    order = await db.get(Order, order_id)
     
     if not order:
         raise HTTPException(
@@ -371,10 +450,11 @@ async def update_order(
                 order.shipped_at = datetime.utcnow()
         setattr(order, field, value)
     
-    db.commit()
-    db.refresh(order)
+    await db.commit()
+    invalidate_counts("orders")  # Admin list is filtered by status
     
-    return order
+    orders = await get_orders_with_items([order_id], db)
+    return orders[0]
 
 
 @router.get("/admin/all", response_model=OrderListResponse)
@@ -382,28 +462,28 @@ async def get_all_orders(
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
     status: Optional[str] = None,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы (вместо skip, без подсчёта total)"),
+    total_mode: TotalMode = Query("exact", description=TOTAL_MODE_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_db),
     current_admin: User = Depends(get_current_admin)
 ):
     """
     Получить все заказы (только для администраторов)
     """
-    from sqlalchemy.orm import joinedload
-
-    query = db.query(Order)
-
-    if status:
-        query = query.filter(Order.status == status)
+    query = admin_orders_query(status)
 
-    total = query.count()
+    total, total_estimated = None, False
+    if cursor is None:
+        total, total_estimated = await count_total(db, query, "orders", total_mode)
     # Use eager loading to include product data for admin
-    orders = query.options(
-        joinedload(Order.items).joinedload(OrderItem.product)
-    ).order_by(Order.created_at.desc()).offset(skip).limit(limit).all()
+    result = await db.execute(orders_page_query(query, cursor, skip, limit))
+    orders, next_cursor = split_page(result.scalars().all(), limit)
 
     return OrderListResponse(
         orders=orders,
         total=total,
-        page=skip // limit + 1,
-        page_size=limit
+        total_estimated=total_estimated,
+        page=skip // limit + 1 if cursor is None else None,
+        page_size=limit,
+        next_cursor=next_cursor
     )
@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Request
 from sqlalchemy.orm import Session
 
 from app.core.database import get_db
+from app.core.replica import get_read_db
 from app.core.security import get_current_admin
 from app.models.page import Page
 from app.schemas.page import PageCreate, PageUpdate, PageResponse
+from app.utils.http_cache import CACHE_CONTROL_PAGE, conditional_json_response, is_not_modified, make_etag, not_modified_response
 
 router = APIRouter()
 
@@ -23,7 +25,7 @@ async def get_pages(
 
 
 @router.get("/{slug}", response_model=PageResponse)
-async def get_page_by_slug(slug: str, db: Session = Depends(get_db)):
+async def get_page_by_slug(slug: str, request: Request, db: Session = Depends(get_read_db)):
     """
     Получить страницу по slug
     """
@@ -33,7 +35,14 @@ async def get_page_by_slug(slug: str, db: Session = Depends(get_db)):
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Страница не найдена"
         )
-    return page
+    
+    # Version-based ETag: answer 304 without serializing the content
+    etag = make_etag(page.id, page.slug, page.updated_at.isoformat() if page.updated_at else "")
+    if is_not_modified(request, etag):
+        return not_modified_response(etag, CACHE_CONTROL_PAGE)
+    
+    payload = PageResponse.model_validate(page).model_dump_json().encode()
+    return conditional_json_response(request, payload, CACHE_CONTROL_PAGE, etag=etag)
 
 
 @router.post("/", response_model=PageResponse, status_code=status.HTTP_201_CREATED)
@@ -1,9 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
 from sqlalchemy.orm.attributes import flag_modified
 from datetime import datetime
 
-from app.core.database import get_db
+from app.core.database import get_async_db
 from app.core.security import get_current_user
 from app.models.user import User
 from app.models.order import Order, OrderItem, PaymentStatus
@@ -16,13 +19,13 @@ router = APIRouter()
 async def create_payment(
     order_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Создать платеж для заказа через ЮKassa
     """
     # Получить заказ
-    order = db.query(Order).filter(Order.id == order_id).first()
+    order = await db.get(Order, order_id)
 
     if not order:
         raise HTTPException(
@@ -45,22 +48,24 @@ async def create_payment(
         )
 
     # Загрузить связанные данные для платежа
-    from sqlalchemy.orm import joinedload
-    order = db.query(Order).options(
-        joinedload(Order.user),
-        joinedload(Order.items).joinedload(OrderItem.product)
-    ).filter(Order.id == order_id).first()
+    result = await db.execute(
+        select(Order).options(
+            joinedload(Order.user),
+            selectinload(Order.items).joinedload(OrderItem.product)
+        ).where(Order.id == order_id).execution_options(populate_existing=True)
+    )
+    order = result.scalars().first()
 
     try:
-        # Создать платеж через сервис
-        payment_result = payment_service.create_payment(order)
+        # Создать платеж через сервис (HTTP-запрос к ЮKassa выполняется в пуле потоков)
+        payment_result = await run_in_threadpool(payment_service.create_payment, order)
 
         # Обновить заказ с данными платежа
         order.payment_id = payment_result["payment_id"]
         order.payment_url = payment_result["confirmation_url"]
         order.payment_status = PaymentStatus.PENDING
 
-        db.commit()
+        await db.commit()
 
         return {
             "payment_id": payment_result["payment_id"],
@@ -88,10 +93,15 @@ async def payment_callback(
     return {"status": "success"}
 
 
+def order_by_payment_id_query(payment_id: str):
+    """Заказ по ID платежа ЮKassa (частичный индекс ix_orders_payment_id)"""
+    return select(Order).where(Order.payment_id == payment_id)
+
+
 @router.post("/webhook")
 async def payment_webhook(
     request_body: dict,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Webhook от ЮKassa для уведомлений о статусе платежа
@@ -103,7 +113,8 @@ async def payment_webhook(
         # Найти заказ по payment_id из метаданных
         payment_id = webhook_data.get("payment_id")
         if payment_id:
-            order = db.query(Order).filter(Order.payment_id == payment_id).first()
+            result = await db.execute(order_by_payment_id_query(payment_id))
+            order = result.scalars().first()
             if order:
                 if webhook_data["event"] == "payment.succeeded":
                     order.payment_status = PaymentStatus.SUCCEEDED
@@ -112,7 +123,7 @@ async def payment_webhook(
                 elif webhook_data["event"] == "payment.canceled":
                     order.payment_status = PaymentStatus.CANCELLED
 
-                db.commit()
+                await db.commit()
 
         return {"status": "processed"}
 
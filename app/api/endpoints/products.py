@@ -1,20 +1,87 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File
-from sqlalchemy.orm import Session
-from typing import Optional, List
-import os
-import uuid
+from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, delete, func, case
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload, load_only
+from typing import Optional, List, Literal, Union
 from datetime import datetime
-import shutil
-
-from app.core.database import get_db
+import re
+
+from app.core.config import settings
+from app.core.database import get_async_db
+from app.core.replica import get_async_catalog_db, get_async_read_db
+from app.utils.counting import TOTAL_MODE_DESCRIPTION, TotalMode, count_total
+from app.utils.pagination import apply_keyset, split_page
+from app.utils.http_cache import CACHE_CONTROL_CATALOG, conditional_json_response
 from app.core.security import get_current_admin
 from app.models.product import Product, ProductMedia, OrderType, ProductionStatus
 from app.models.order import OrderItem
 from app.models.cart import CartItem
-from app.schemas.product import ProductCreate, ProductUpdate, ProductResponse, ProductListResponse
+from app.schemas.product import (
+    ProductCreate,
+    ProductUpdate,
+    ProductResponse,
+    ProductListResponse,
+    ProductCardListResponse,
+    ProductSearchResponse,
+    ProductSearchFacets,
+    PriceRangeFacet,
+    ProductImportResult,
+    StockAdjustmentRequest,
+    StockAdjustmentResponse
+)
+from app.services.catalog_cache import catalog_cache
+from app.services.images import ImageProcessingError
+from app.services.media import media_storage, UploadLimitExceeded
+from app.services.product_import import (
+    ImportFormat,
+    count_existing_articles,
+    export_products,
+    upsert_products,
+    validate_import_rows
+)
+from app.services.stock import StockAdjustmentError, UnknownArticlesError, apply_stock_deltas
 
 router = APIRouter()
 
+# Колонки, нужные для карточки товара в списке
+PRODUCT_CARD_COLUMNS = (
+    Product.id,
+    Product.name,
+    Product.article,
+    Product.price,
+    Product.preview_image_url,
+    Product.order_type,
+    Product.oki_quantity,
+    Product.big_quantity,
+    Product.is_active,
+    Product.is_archived,
+    Product.created_at,
+    Product.updated_at,
+)
+
+# Границы диапазонов цен для фасета поиска
+PRICE_FACET_BOUNDS = (2000, 5000, 10000)
+
+
+def build_search_query(q: str):
+    """Преобразовать строку поиска в tsquery с префиксным совпадением слов"""
+    words = re.findall(r"\w+", q.lower())
+    if not words:
+        return None
+    return func.to_tsquery("russian", " & ".join(f"{word}:*" for word in words))
+
+
+async def get_product_with_media(product_id: int, db: AsyncSession) -> Optional[Product]:
+    """Получить товар вместе с медиа (без ленивой загрузки)"""
+    result = await db.execute(
+        select(Product)
+        .options(selectinload(Product.media))
+        .where(Product.id == product_id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalars().first()
+
 
 @router.post("/upload-images", response_model=List[str])
 async def upload_product_images(
@@ -24,35 +91,27 @@ async def upload_product_images(
     """
     Загрузка изображений для товаров (только для администраторов)
     """
-    uploaded_urls = []
-
-    # Создаем директорию для загрузок, если она не существует
-    upload_dir = "static/uploads/products"
-    os.makedirs(upload_dir, exist_ok=True)
-
+    # Проверяем тип файлов до записи на диск
     for file in files:
-        # Проверяем тип файла
-        if not file.content_type.startswith('image/'):
+        if not (file.content_type or "").startswith('image/'):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Файл {file.filename} не является изображением"
             )
 
-        # Генерируем уникальное имя файла
-        file_extension = os.path.splitext(file.filename)[1]
-        unique_filename = f"{uuid.uuid4()}{file_extension}"
-        file_path = os.path.join(upload_dir, unique_filename)
-
-        # Сохраняем файл
-        with open(file_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
-
-        # Формируем URL для доступа к файлу
-        file_url = f"/static/uploads/products/{unique_filename}"
-        uploaded_urls.append(file_url)
-
-    return uploaded_urls
+    # Сохраняем файлы параллельно, потоково и с ограничением размера
+    try:
+        return await media_storage.save_uploads(files)
+    except UploadLimitExceeded as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
+        )
+    except ImageProcessingError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
 
 
 @router.post("/upload-preview-image", response_model=str)
@@ -64,86 +123,322 @@ async def upload_preview_image(
     Загрузка превью изображения для товара (только для администраторов)
     """
     # Проверяем тип файла
-    if not file.content_type.startswith('image/'):
+    if not (file.content_type or "").startswith('image/'):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Файл {file.filename} не является изображением"
         )
 
-    # Создаем директорию для загрузок, если она не существует
-    upload_dir = "static/uploads/products"
-    os.makedirs(upload_dir, exist_ok=True)
+    try:
+        urls = await media_storage.save_uploads([file], prefix="preview_")
+    except UploadLimitExceeded as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
+        )
+    except ImageProcessingError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    return urls[0]
+
 
-    # Генерируем уникальное имя файла
-    file_extension = os.path.splitext(file.filename)[1]
-    unique_filename = f"preview_{uuid.uuid4()}{file_extension}"
-    file_path = os.path.join(upload_dir, unique_filename)
+def catalog_query(is_active: Optional[bool], is_archived: Optional[bool]):
+    """Товары каталога с фильтрами списка (без сортировки и пагинации)"""
+    query = select(Product)
+    
+    if is_active is not None:
+        query = query.where(Product.is_active == is_active)
+    
+    if is_archived is not None:
+        query = query.where(Product.is_archived == is_archived)
+    
+    return query
 
-    # Сохраняем файл
-    with open(file_path, "wb") as buffer:
-        content = await file.read()
-        buffer.write(content)
 
-    # Формируем URL для доступа к файлу
-    file_url = f"/static/uploads/products/{unique_filename}"
-    return file_url
+def product_usage_query(model, product_id: int):
+    """Есть ли у товара позиции заказов (OrderItem) или корзин (CartItem)"""
+    return select(model.id).where(model.product_id == product_id).limit(1)
 
 
-@router.get("/", response_model=ProductListResponse)
+@router.get("/", response_model=Union[ProductListResponse, ProductCardListResponse])
 async def get_products(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
     is_active: Optional[bool] = None,
     is_archived: Optional[bool] = False,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы (вместо skip, без подсчёта total)"),
+    view: Literal["full", "card"] = Query("full", description="card - только поля карточки товара"),
+    total_mode: TotalMode = Query("exact", description=TOTAL_MODE_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_catalog_db)
 ):
     """
     Получить список товаров
     """
-    query = db.query(Product)
+    cache_key = (skip, limit, is_active, is_archived, cursor, view, total_mode)
+    cached = catalog_cache.get_list(cache_key)
+    if cached is not None:
+        return conditional_json_response(request, cached, CACHE_CONTROL_CATALOG)
     
-    if is_active is not None:
-        query = query.filter(Product.is_active == is_active)
+    query = catalog_query(is_active, is_archived)
     
-    if is_archived is not None:
-        query = query.filter(Product.is_archived == is_archived)
+    total, total_estimated = None, False
+    if cursor is None:
+        total, total_estimated = await count_total(db, query, "products", total_mode)
+    
+    # Два запроса на страницу: товары + медиа одним IN-запросом
+    options = [selectinload(Product.media)]
+    if view == "card":
+        options.append(load_only(*PRODUCT_CARD_COLUMNS))
+    page_query = apply_keyset(query.options(*options), Product, cursor, limit)
+    if cursor is None:
+        page_query = page_query.offset(skip)
+    result = await db.execute(page_query)
+    products, next_cursor = split_page(result.scalars().all(), limit)
+    
+    response_class = ProductCardListResponse if view == "card" else ProductListResponse
+    payload = response_class(
+        products=products,
+        total=total,
+        total_estimated=total_estimated,
+        page=skip // limit + 1 if cursor is None else None,
+        page_size=limit,
+        next_cursor=next_cursor
+    ).model_dump_json().encode()
+    catalog_cache.set_list(cache_key, payload)
+    
+    return conditional_json_response(request, payload, CACHE_CONTROL_CATALOG)
+
+
+@router.get("/search", response_model=ProductSearchResponse)
+async def search_products(
+    q: str = Query("", max_length=200, description="Строка поиска по названию, описанию и артикулу"),
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    order_type: Optional[str] = Query(None, description="order, preorder, waiting"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    Полнотекстовый поиск товаров с фасетами по типу заказа и цене
+    """
+    if order_type is not None:
+        try:
+            order_type = OrderType(order_type)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Неверный тип заказа {order_type}"
+            )
+    
+    ts_query = build_search_query(q)
+    
+    # Фильтры: каждый фасет считается без собственного фильтра
+    base_filters = [Product.is_active == True, Product.is_archived == False]
+    if ts_query is not None:
+        base_filters.append(Product.search_vector.op("@@")(ts_query))
+    price_filters = []
+    if min_price is not None:
+        price_filters.append(Product.price >= min_price)
+    if max_price is not None:
+        price_filters.append(Product.price <= max_price)
+    order_type_filters = [Product.order_type == order_type] if order_type is not None else []
     
-    total = query.count()
-    products = query.offset(skip).limit(limit).all()
+    filters = base_filters + price_filters + order_type_filters
+    total = await db.scalar(select(func.count(Product.id)).where(*filters))
     
-    return ProductListResponse(
+    query = select(Product).options(selectinload(Product.media)).where(*filters)
+    if ts_query is not None:
+        query = query.order_by(func.ts_rank_cd(Product.search_vector, ts_query).desc(), Product.id)
+    else:
+        query = query.order_by(Product.created_at, Product.id)
+    result = await db.execute(query.offset(skip).limit(limit))
+    products = result.scalars().all()
+    
+    # Фасет: тип заказа
+    result = await db.execute(
+        select(Product.order_type, func.count(Product.id))
+        .where(*base_filters, *price_filters)
+        .group_by(Product.order_type)
+    )
+    order_type_counts = {row_type.value: count for row_type, count in result.all()}
+    
+    # Фасет: цена (min/max и количество по диапазонам) одним запросом
+    bounds = (None,) + PRICE_FACET_BOUNDS + (None,)
+    range_counts = []
+    for price_from, price_to in zip(bounds, bounds[1:]):
+        if price_from is None:
+            condition = Product.price < price_to
+        elif price_to is None:
+            condition = Product.price >= price_from
+        else:
+            condition = (Product.price >= price_from) & (Product.price < price_to)
+        range_counts.append(func.count(case((condition, 1))))
+    result = await db.execute(
+        select(func.min(Product.price), func.max(Product.price), *range_counts)
+        .where(*base_filters, *order_type_filters)
+    )
+    price_min, price_max, *counts = result.one()
+    
+    return ProductSearchResponse(
         products=products,
         total=total,
         page=skip // limit + 1,
-        page_size=limit
+        page_size=limit,
+        facets=ProductSearchFacets(
+            order_type=order_type_counts,
+            price_min=price_min,
+            price_max=price_max,
+            price_ranges=[
+                PriceRangeFacet(price_from=price_from, price_to=price_to, count=count)
+                for price_from, price_to, count in zip(bounds, bounds[1:], counts)
+            ]
+        )
     )
 
 
+@router.post("/import", response_model=ProductImportResult)
+async def import_products(
+    file: UploadFile = File(...),
+    file_format: Optional[ImportFormat] = Query(None, alias="format", description="csv или jsonl (по умолчанию по расширению файла)"),
+    dry_run: bool = Query(False, description="Только проверить файл, ничего не записывая"),
+    db: AsyncSession = Depends(get_async_db),
+    current_admin = Depends(get_current_admin)
+):
+    """
+    Массовый импорт товаров из CSV/JSONL с upsert по артикулу (только для администраторов)
+
+    Все строки записываются в одной транзакции; при ошибке хотя бы в одной
+    строке ничего не записывается и возвращается отчёт по строкам.
+    """
+    if file_format is None:
+        file_format = "jsonl" if (file.filename or "").lower().endswith((".jsonl", ".ndjson")) else "csv"
+
+    content = await file.read(settings.UPLOAD_MAX_FILE_SIZE + 1)
+    if len(content) > settings.UPLOAD_MAX_FILE_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Файл больше {settings.UPLOAD_MAX_FILE_SIZE // (1024 * 1024)} МБ"
+        )
+    try:
+        total_rows, rows, errors = validate_import_rows(content, file_format)
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Файл должен быть в кодировке UTF-8"
+        )
+
+    if dry_run or errors:
+        updated = await count_existing_articles(db, [row.article for row in rows])
+        return ProductImportResult(
+            dry_run=dry_run,
+            committed=False,
+            total_rows=total_rows,
+            created=len(rows) - updated,
+            updated=updated,
+            errors=errors
+        )
+
+    created, updated, released_urls = await upsert_products(db, rows)
+    await db.commit()
+    catalog_cache.clear()
+
+    # Replaced previews and media are removed unless still used elsewhere
+    await media_storage.remove_unreferenced(db, released_urls)
+
+    return ProductImportResult(
+        dry_run=False,
+        committed=True,
+        total_rows=total_rows,
+        created=created,
+        updated=updated
+    )
+
+
+@router.get("/export")
+async def export_products_file(
+    file_format: ImportFormat = Query("csv", alias="format", description="csv или jsonl"),
+    current_admin = Depends(get_current_admin)
+):
+    """
+    Потоковый экспорт всех товаров в формате импорта (только для администраторов)
+    """
+    media_type = "text/csv" if file_format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        export_products(file_format),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f"attachment; filename=products_{datetime.utcnow().strftime('%Y%m%d')}.{file_format}"
+        }
+    )
+
+
+@router.post("/stock/adjust", response_model=StockAdjustmentResponse)
+async def adjust_stock(
+    adjustment: StockAdjustmentRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_admin = Depends(get_current_admin)
+):
+    """
+    Пакетное изменение остатков по артикулу и размеру (только для администраторов)
+
+    Изменения относительные и применяются в одной транзакции: либо все, либо ни одного.
+    """
+    try:
+        levels = await apply_stock_deltas(db, adjustment.items)
+    except StockAdjustmentError as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND if isinstance(e, UnknownArticlesError) else status.HTTP_409_CONFLICT,
+            detail=e.message
+        )
+
+    await db.commit()
+    catalog_cache.invalidate_products([level.id for level in levels])
+
+    return StockAdjustmentResponse(products=levels)
+
+
 @router.get("/{product_id}", response_model=ProductResponse)
-async def get_product(product_id: int, db: Session = Depends(get_db)):
+async def get_product(
+    product_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_async_catalog_db)
+):
     """
     Получить товар по ID
     """
-    product = db.query(Product).filter(Product.id == product_id).first()
+    cached = catalog_cache.get_product(product_id)
+    if cached is not None:
+        return conditional_json_response(request, cached, CACHE_CONTROL_CATALOG)
+    
+    product = await get_product_with_media(product_id, db)
     if not product:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Товар не найден"
         )
-    return product
+    
+    payload = ProductResponse.model_validate(product).model_dump_json().encode()
+    catalog_cache.set_product(product_id, payload)
+    
+    return conditional_json_response(request, payload, CACHE_CONTROL_CATALOG)
 
 
 @router.post("/", response_model=ProductResponse, status_code=status.HTTP_201_CREATED)
 async def create_product(
     product_data: ProductCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_admin = Depends(get_current_admin)
 ):
     """
     Создать новый товар (только для администраторов)
     """
     # Check if article already exists
-    existing = db.query(Product).filter(Product.article == product_data.article).first()
+    existing = await db.scalar(select(Product.id).where(Product.article == product_data.article))
     if existing:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -167,40 +462,44 @@ async def create_product(
     )
     
     db.add(product)
-    db.commit()
-    db.refresh(product)
+    await db.flush()
     
     # Add media
     for idx, url in enumerate(product_data.media_urls):
         media = ProductMedia(product_id=product.id, url=url, order=idx)
         db.add(media)
     
-    db.commit()
-    db.refresh(product)
+    await db.commit()
+    catalog_cache.invalidate_products([product.id])
     
-    return product
+    return await get_product_with_media(product.id, db)
 
 
 @router.put("/{product_id}", response_model=ProductResponse)
 async def update_product(
     product_id: int,
     product_data: ProductUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_admin = Depends(get_current_admin)
 ):
     """
     Обновить товар (только для администраторов)
     """
-    product = db.query(Product).filter(Product.id == product_id).first()
+    product = await db.get(Product, product_id)
     if not product:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Товар не найден"
         )
 
+    # Files that may become unreferenced by this update
+    released_urls = []
+
     # Update fields
     update_data = product_data.dict(exclude_unset=True)
     for field, value in update_data.items():
+        if field == "preview_image_url":
+            released_urls.append(product.preview_image_url)
         if field == "order_type" and value:
             value = OrderType(value)
         elif field == "production_status" and value:
@@ -209,19 +508,11 @@ async def update_product(
             # Handle media updates
             if value is not None:
                 # Get existing media before deleting
-                existing_media = db.query(ProductMedia).filter(ProductMedia.product_id == product_id).all()
+                result = await db.execute(select(ProductMedia.url).where(ProductMedia.product_id == product_id))
+                released_urls.extend(result.scalars().all())
 
                 # Delete existing media records
-                db.query(ProductMedia).filter(ProductMedia.product_id == product_id).delete()
-
-                # Remove old files from filesystem
-                for media in existing_media:
-                    file_path = os.path.join("static", media.url.lstrip("/"))
-                    if os.path.exists(file_path):
-                        try:
-                            os.remove(file_path)
-                        except OSError:
-                            pass  # Ignore if file doesn't exist or can't be removed
+                await db.execute(delete(ProductMedia).where(ProductMedia.product_id == product_id))
 
                 # Add new media
                 for idx, url in enumerate(value):
@@ -230,22 +521,25 @@ async def update_product(
             continue
         setattr(product, field, value)
 
-    db.commit()
-    db.refresh(product)
+    await db.commit()
+    catalog_cache.invalidate_products([product_id])
 
-    return product
+    # Remove old files from filesystem unless still used by this or another product
+    await media_storage.remove_unreferenced(db, released_urls)
+
+    return await get_product_with_media(product_id, db)
 
 
 @router.delete("/{product_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_product(
     product_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_admin = Depends(get_current_admin)
 ):
     """
     Удалить товар (только для администраторов)
     """
-    product = db.query(Product).filter(Product.id == product_id).first()
+    product = await db.get(Product, product_id)
     if not product:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -253,8 +547,8 @@ async def delete_product(
         )
 
     # Check if product has related order items or cart items
-    has_order_items = db.query(OrderItem).filter(OrderItem.product_id == product_id).first() is not None
-    has_cart_items = db.query(CartItem).filter(CartItem.product_id == product_id).first() is not None
+    has_order_items = await db.scalar(product_usage_query(OrderItem, product_id)) is not None
+    has_cart_items = await db.scalar(product_usage_query(CartItem, product_id)) is not None
 
     if has_order_items or has_cart_items:
         raise HTTPException(
@@ -262,29 +556,16 @@ async def delete_product(
             detail="Нельзя удалить товар, который используется в заказах или корзинах"
         )
 
-    # Get existing media before deleting product
-    existing_media = db.query(ProductMedia).filter(ProductMedia.product_id == product_id).all()
-
-    # Remove media files from filesystem
-    for media in existing_media:
-        file_path = os.path.join("static", media.url.lstrip("/"))
-        if os.path.exists(file_path):
-            try:
-                os.remove(file_path)
-            except OSError:
-                pass  # Ignore if file doesn't exist or can't be removed
-
-    # Also remove preview image if exists
-    if product.preview_image_url:
-        preview_path = os.path.join("static", product.preview_image_url.lstrip("/"))
-        if os.path.exists(preview_path):
-            try:
-                os.remove(preview_path)
-            except OSError:
-                pass  # Ignore if file doesn't exist or can't be removed
-
-    db.delete(product)
-    db.commit()
+    # Get media and preview URLs before deleting product
+    result = await db.execute(select(ProductMedia.url).where(ProductMedia.product_id == product_id))
+    released_urls = [*result.scalars().all(), product.preview_image_url]
+
+    await db.delete(product)
+    await db.commit()
+    catalog_cache.invalidate_products([product_id])
+
+    # Remove media files from filesystem unless used by another product
+    await media_storage.remove_unreferenced(db, released_urls)
 
     return None
 
@@ -292,13 +573,13 @@ async def delete_product(
 @router.post("/{product_id}/archive", response_model=ProductResponse)
 async def archive_product(
     product_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_admin = Depends(get_current_admin)
 ):
     """
     Архивировать товар (только для администраторов)
     """
-    product = db.query(Product).filter(Product.id == product_id).first()
+    product = await db.get(Product, product_id)
     if not product:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -308,7 +589,7 @@ async def archive_product(
     product.is_archived = True
     product.is_active = False
     
-    db.commit()
-    db.refresh(product)
+    await db.commit()
+    catalog_cache.invalidate_products([product_id])
     
-    return product
+    return await get_product_with_media(product_id, db)
@@ -1,28 +1,38 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Response
+from sqlalchemy.orm import Session, selectinload
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 
 from app.core.database import get_db
 from app.core.security import get_current_admin
 from app.models.promo_code import PromoCode
 from app.models.product import Product
 from app.schemas.promo_code import PromoCodeCreate, PromoCodeUpdate, PromoCodeResponse, PromoCodeValidation
+from app.utils.pagination import apply_keyset, split_page
 
 router = APIRouter()
 
 
 @router.get("/", response_model=list[PromoCodeResponse])
 async def get_promo_codes(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     current_admin = Depends(get_current_admin)
 ):
     """
     Получить все промокоды (только для администраторов)
+    
+    Курсор следующей страницы возвращается в заголовке X-Next-Cursor
     """
-    promo_codes = db.query(PromoCode).offset(skip).limit(limit).all()
+    query = apply_keyset(db.query(PromoCode), PromoCode, cursor, limit)
+    if cursor is None:
+        query = query.offset(skip)
+    promo_codes, next_cursor = split_page(query.all(), limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return promo_codes
 
 
@@ -58,7 +68,9 @@ async def validate_promo_code(
     """
     code = request.code
     product_ids = request.product_ids
-    promo_code = db.query(PromoCode).filter(PromoCode.code == code).first()
+    promo_code = db.query(PromoCode).options(
+        selectinload(PromoCode.products)
+    ).filter(PromoCode.code == code).first()
     
     if not promo_code:
         return PromoCodeValidation(
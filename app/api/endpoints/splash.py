@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from sqlalchemy.orm import Session
 from typing import Optional
 import random
 
 from app.core.database import get_db
+from app.core.replica import get_read_db
 from app.core.security import get_current_admin
 from app.models.splash import SplashNotification
 from app.schemas.splash import (
@@ -13,12 +14,14 @@ from app.schemas.splash import (
     SplashNotificationListResponse,
     RandomSplashResponse
 )
+from app.utils.counting import TOTAL_MODE_DESCRIPTION, TotalMode, count_total_sync, invalidate_counts
+from app.utils.http_cache import CACHE_CONTROL_REVALIDATE, conditional_json_response
 
 router = APIRouter()
 
 
 @router.get("/random", response_model=RandomSplashResponse)
-async def get_random_splash(db: Session = Depends(get_db)):
+async def get_random_splash(request: Request, db: Session = Depends(get_read_db)):
     """
     Получить случайное активное splash уведомление
     """
@@ -28,10 +31,13 @@ async def get_random_splash(db: Session = Depends(get_db)):
 
     if not active_notifications:
         # Return default message if no active notifications
-        return RandomSplashResponse(text="Добро пожаловать в DWC Shop!")
+        splash = RandomSplashResponse(text="Добро пожаловать в DWC Shop!")
+    else:
+        random_notification = random.choice(active_notifications)
+        splash = RandomSplashResponse(text=random_notification.text)
 
-    random_notification = random.choice(active_notifications)
-    return RandomSplashResponse(text=random_notification.text)
+    payload = splash.model_dump_json().encode()
+    return conditional_json_response(request, payload, CACHE_CONTROL_REVALIDATE)
 
 
 @router.get("/", response_model=SplashNotificationListResponse)
@@ -39,6 +45,7 @@ async def get_splash_notifications(
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
     is_active: Optional[bool] = None,
+    total_mode: TotalMode = Query("exact", description=TOTAL_MODE_DESCRIPTION),
     db: Session = Depends(get_db),
     current_admin = Depends(get_current_admin)
 ):
@@ -50,12 +57,13 @@ async def get_splash_notifications(
     if is_active is not None:
         query = query.filter(SplashNotification.is_active == is_active)
 
-    total = query.count()
+    total, total_estimated = count_total_sync(db, query, "splash_notifications", total_mode)
     notifications = query.offset(skip).limit(limit).all()
 
     return SplashNotificationListResponse(
         notifications=notifications,
         total=total,
+        total_estimated=total_estimated,
         page=skip // limit + 1,
         page_size=limit
     )
@@ -99,6 +107,7 @@ async def create_splash_notification(
 
     db.add(notification)
     db.commit()
+    invalidate_counts("splash_notifications")
     db.refresh(notification)
 
     return notification
@@ -129,6 +138,7 @@ async def update_splash_notification(
         setattr(notification, field, value)
 
     db.commit()
+    invalidate_counts("splash_notifications")
     db.refresh(notification)
 
     return notification
@@ -154,4 +164,5 @@ async def delete_splash_notification(
         )
 
     db.delete(notification)
-    db.commit()
\ No newline at end of file
+    db.commit()
+    invalidate_counts("splash_notifications")
\ No newline at end of file
@@ -1,14 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Response
+from typing import Optional
 from sqlalchemy.orm import Session
 
 from app.core.database import get_db
-from app.core.security import get_current_user, get_current_admin, verify_password, get_password_hash
+from app.core.security import get_current_user, get_current_admin, verify_password_async, get_password_hash_async, invalidate_cached_user
 from app.models.user import User
 from app.schemas.user import UserResponse, UserUpdate, PasswordChange
+from app.utils.pagination import apply_keyset, split_page
 
 router = APIRouter()
 
 
+def get_user_row(user_id: int, db: Session) -> User:
+    """Пользователь из БД (а не из кэша аутентификации) для изменения"""
+    user = db.get(User, user_id)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Пользователь не найден"
+        )
+    return user
+
+
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_info(current_user: User = Depends(get_current_user)):
     """
@@ -26,8 +39,8 @@ async def update_current_user(
     """
     Обновить профиль текущего пользователя
     """
-    # Merge user into session if not already present
-    user = db.merge(current_user)
+    # current_user may be a stale cached copy: change only the requested fields of the row
+    user = get_user_row(current_user.id, db)
     
     # Update user fields
     update_data = user_data.dict(exclude_unset=True)
@@ -36,6 +49,7 @@ async def update_current_user(
     
     db.commit()
     db.refresh(user)
+    invalidate_cached_user(user.id)
     
     return user
 
@@ -49,33 +63,44 @@ async def change_password(
     """
     Изменить пароль текущего пользователя
     """
-    # Verify current password
-    if not verify_password(password_data.current_password, current_user.password_hash):
+    user = get_user_row(current_user.id, db)
+
+    # Verify current password (against the stored hash, not the cached copy)
+    if not await verify_password_async(password_data.current_password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Неверный текущий пароль"
         )
 
     # Update password
-    user = db.merge(current_user)
-    user.password_hash = get_password_hash(password_data.new_password)
+    user.password_hash = await get_password_hash_async(password_data.new_password)
 
     db.commit()
+    invalidate_cached_user(user.id)
 
     return {"message": "Пароль успешно изменен"}
 
 
 @router.get("/", response_model=list[UserResponse])
 async def get_all_users(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     current_admin: User = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
     """
     Получить список всех пользователей (только для администраторов)
+    
+    Курсор следующей страницы возвращается в заголовке X-Next-Cursor
     """
-    users = db.query(User).offset(skip).limit(limit).all()
+    query = apply_keyset(db.query(User), User, cursor, limit)
+    if cursor is None:
+        query = query.offset(skip)
+    users, next_cursor = split_page(query.all(), limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return users
 
 
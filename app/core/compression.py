@@ -0,0 +1,181 @@
+"""
+Response compression middleware (brotli / gzip)
+"""
+import gzip
+import zlib
+from typing import Iterable, Optional
+
+import brotli
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.utils.http_cache import encoded_etag
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Preferred supported encoding from Accept-Encoding header (br over gzip)"""
+    accepted = set()
+    for value in accept_encoding.lower().split(","):
+        coding, _, params = value.partition(";")
+        params = params.replace(" ", "")
+        try:
+            quality = float(params[2:]) if params.startswith("q=") else 1.0
+        except ValueError:
+            quality = 0.0
+        if quality > 0:
+            accepted.add(coding.strip())
+    if "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+class _Compressor:
+    """Incremental brotli/gzip compressor with a common interface"""
+
+    def __init__(self, encoding: str, brotli_quality: int, gzip_level: int):
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+            self._zlib = None
+        else:
+            self._brotli = None
+            # wbits=31: gzip container
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        if self._brotli is not None:
+            return self._brotli.process(data)
+        return self._zlib.compress(data)
+
+    def flush(self) -> bytes:
+        if self._brotli is not None:
+            return self._brotli.finish()
+        return self._zlib.flush()
+
+
+def compress_body(data: bytes, encoding: str, brotli_quality: int, gzip_level: int) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=brotli_quality)
+    return gzip.compress(data, compresslevel=gzip_level, mtime=0)
+
+
+class CompressionMiddleware:
+    """
+    Compress responses with brotli or gzip (pure ASGI, streaming-safe)
+
+    Only content types from the allowlist are compressed; complete bodies
+    smaller than minimum_size are sent as is. Streaming bodies are compressed
+    chunk by chunk. Strong ETags of compressed bodies get an encoding suffix.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        content_types: Iterable[str] = ("application/json",),
+        brotli_quality: int = 4,
+        gzip_level: int = 6,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.content_types = tuple(content_types)
+        self.brotli_quality = brotli_quality
+        self.gzip_level = gzip_level
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_headers = Headers(scope=scope)
+        encoding = choose_encoding(request_headers.get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressedResponder(self, encoding, send, request_headers.get("if-none-match", ""))
+        await self.app(scope, receive, responder.send_wrapper)
+
+
+class _CompressedResponder:
+    """Send wrapper of one response"""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send, if_none_match: str = ""):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.send = send
+        self.if_none_match = if_none_match
+        self.start_message: Optional[Message] = None
+        self.compressor: Optional[_Compressor] = None
+        self.passthrough = False
+
+    def _is_compressible(self, headers: Headers) -> bool:
+        if "content-encoding" in headers or "content-range" in headers:
+            return False
+        content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+        return content_type.startswith(self.middleware.content_types)
+
+    def _restore_encoded_etag(self, message: Message) -> None:
+        """304 for a compressed copy carries the tag the client validated"""
+        headers = MutableHeaders(raw=message["headers"])
+        etag = headers.get("etag")
+        if etag:
+            encoded = encoded_etag(etag, self.encoding)
+            if encoded != etag and encoded in {tag.strip() for tag in self.if_none_match.split(",")}:
+                headers["ETag"] = encoded
+
+    async def send_wrapper(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            # Defer until the first body chunk shows the response size
+            self.start_message = message
+            self.passthrough = not self._is_compressible(Headers(raw=message["headers"]))
+            if message["status"] == 304:
+                self._restore_encoded_etag(message)
+            return
+
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        if self.start_message is not None:
+            start_message, self.start_message = self.start_message, None
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if self.passthrough or (not more_body and len(body) < self.middleware.minimum_size):
+                self.passthrough = True
+                await self.send(start_message)
+                await self.send(message)
+                return
+
+            headers = MutableHeaders(raw=start_message["headers"])
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if "etag" in headers:
+                # Different bytes than the identity body: the strong tag must differ too
+                headers["ETag"] = encoded_etag(headers["etag"], self.encoding)
+            if not more_body:
+                # Complete body: compress in one go
+                compressed = compress_body(
+                    body, self.encoding, self.middleware.brotli_quality, self.middleware.gzip_level
+                )
+                headers["Content-Length"] = str(len(compressed))
+                await self.send(start_message)
+                await self.send({"type": "http.response.body", "body": compressed})
+                return
+
+            # Streaming body: length is unknown in advance
+            del headers["Content-Length"]
+            self.compressor = _Compressor(
+                self.encoding, self.middleware.brotli_quality, self.middleware.gzip_level
+            )
+            await self.send(start_message)
+
+        if self.passthrough:
+            await self.send(message)
+            return
+
+        more_body = message.get("more_body", False)
+        chunk = self.compressor.compress(message.get("body", b""))
+        if not more_body:
+            chunk += self.compressor.flush()
+        await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
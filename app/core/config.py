@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Optional
 import os
 
 
@@ -17,11 +17,77 @@ class Settings(BaseSettings):
     POSTGRES_USER: str = "dwc_user"
     POSTGRES_PASSWORD: str = "dwc_password"
     POSTGRES_DB: str = "dwc_shop"
+    DATABASE_ECHO: bool = False
+    
+    # Database connection pool (per engine, per worker)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0  # seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800  # seconds, -1 to disable
+    
+    # Read replica (optional) for read-only catalog and analytics endpoints
+    DATABASE_REPLICA_URL: Optional[str] = None
+    DB_REPLICA_READ_YOUR_WRITES_SECONDS: int = 5  # reads go to primary after user's own write
+    DB_REPLICA_RETRY_SECONDS: int = 30  # skip replica after connection failure
+    
+    # Product catalog cache (per worker)
+    CATALOG_CACHE_TTL_SECONDS: int = 30
+    CATALOG_CACHE_MAX_PRODUCTS: int = 5000
+    CATALOG_CACHE_MAX_LISTS: int = 500
+    CART_PRODUCT_FRAGMENT_TTL_SECONDS: int = 300  # keyed by product version, TTL only bounds memory
+    
+    # Listing totals (total_mode=exact|estimate|none)
+    COUNT_CACHE_TTL_SECONDS: int = 10
+    COUNT_CACHE_MAX_SIZE: int = 1000  # cached filter combinations per table
+    COUNT_ESTIMATE_MIN_ROWS: int = 10000  # smaller estimates are replaced by exact count
+    
+    # Uploads
+    UPLOAD_DIR: str = "static/uploads/products"
+    UPLOAD_MAX_FILE_SIZE: int = 10 * 1024 * 1024  # bytes
+    UPLOAD_MAX_REQUEST_SIZE: int = 50 * 1024 * 1024  # bytes, all files of one request
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024
+    
+    # Response compression (brotli/gzip)
+    COMPRESSION_MIN_SIZE: int = 1024  # bytes
+    COMPRESSION_CONTENT_TYPES: List[str] = [
+        "application/json",
+        "application/x-ndjson",
+        "text/csv",
+        "text/html",
+        "text/plain",
+        "image/svg+xml",
+    ]
+    COMPRESSION_BROTLI_QUALITY: int = 4  # 0-11, dynamic responses favour speed
+    COMPRESSION_GZIP_LEVEL: int = 6
+    
+    # Static files: set to false when Caddy serves /static directly (see Caddyfile)
+    STATIC_SERVED_BY_APP: bool = True
+    
+    # Image variants (thumb/card/carousel in WebP and JPEG)
+    IMAGE_PROCESS_WORKERS: int = 2
+    IMAGE_QUALITY: int = 82
+    
+    # Stock reservations: cart lines hold stock until checkout or expiry
+    STOCK_RESERVATIONS_ENABLED: bool = False
+    STOCK_RESERVATION_TTL_SECONDS: int = 900  # extended on every change of the cart line
+    STOCK_RESERVATION_SWEEP_INTERVAL_SECONDS: int = 60
+    STOCK_RESERVATION_SWEEP_BATCH_SIZE: int = 1000  # expired holds released per statement
+    
+    # Per-request SQL statistics (Server-Timing header, N+1 detection)
+    SQL_STATS_ENABLED: bool = True
+    SQL_N_PLUS_ONE_THRESHOLD: int = 10  # same statement repeated more times per request
     
     # Security
     SECRET_KEY: str = "dwc-secret-key-change-this-in-production-12345678"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_HOURS: int = 24
+    USER_CACHE_TTL_SECONDS: int = 30  # max delay before deactivation/role change applies
+    USER_CACHE_MAX_SIZE: int = 10000
+    
+    # Password hashing (bcrypt)
+    BCRYPT_ROUNDS: int = 12  # hashes with other cost are rehashed on login
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 32  # 503 when more hash jobs are queued
     
     # Admin
     ADMIN_PHONE: str = "+79999999999"
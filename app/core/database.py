@@ -1,17 +1,151 @@
-from sqlalchemy import create_engine
+import logging
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.core.pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool, PoolStats
+
+
+def get_async_database_url(url: str) -> str:
+    """Convert sync PostgreSQL URL to asyncpg driver URL"""
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
+
+
+def get_pool_options() -> dict:
+    """Connection pool options from settings"""
+    return {
+        "pool_pre_ping": True,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+
+
+logger = logging.getLogger("app.db")
+
+
+class QueryStats:
+    """SQL statements executed during one request"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration_ms = 0.0
+        self.statements: Counter = Counter()
+
+    def record(self, statement: str, duration_ms: float) -> None:
+        self.count += 1
+        self.duration_ms += duration_ms
+        self.statements[re.sub(r"\s+", " ", statement).strip()] += 1
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Statement shapes executed more than threshold times (likely N+1)"""
+        return [(stmt, count) for stmt, count in self.statements.most_common() if count > threshold]
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.duration_ms:.1f};desc="{self.count} queries"'
+
+
+_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def start_query_stats() -> QueryStats:
+    """Start collecting SQL statistics for the current request"""
+    stats = QueryStats()
+    _query_stats.set(stats)
+    return stats
+
+
+# Start time lives on the execution context, not the pooled connection:
+# a statement that raises leaves nothing behind for the next one
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _query_stats.get() is not None and context is not None:
+        context._query_start_time = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _query_stats.get()
+    started = getattr(context, "_query_start_time", None)
+    if stats is not None and started is not None:
+        stats.record(statement, (time.perf_counter() - started) * 1000)
+
 
 # Create SQLAlchemy engine
 engine = create_engine(
     settings.DATABASE_URL,
-    pool_pre_ping=True,
-    echo=settings.DEBUG
+    poolclass=InstrumentedQueuePool,
+    echo=settings.DATABASE_ECHO,
+    **get_pool_options()
 )
+engine.pool.stats = PoolStats("primary")
+
+# Create async SQLAlchemy engine (asyncpg) for non-blocking endpoints
+async_engine = create_async_engine(
+    get_async_database_url(settings.DATABASE_URL),
+    poolclass=InstrumentedAsyncQueuePool,
+    echo=settings.DATABASE_ECHO,
+    **get_pool_options()
+)
+async_engine.sync_engine.pool.stats = PoolStats("primary_async")
+
+# Create read replica engines (optional)
+replica_engine = None
+async_replica_engine = None
+if settings.DATABASE_REPLICA_URL:
+    replica_engine = create_engine(
+        settings.DATABASE_REPLICA_URL,
+        poolclass=InstrumentedQueuePool,
+        echo=settings.DATABASE_ECHO,
+        **get_pool_options()
+    )
+    replica_engine.pool.stats = PoolStats("replica")
+
+    async_replica_engine = create_async_engine(
+        get_async_database_url(settings.DATABASE_REPLICA_URL),
+        poolclass=InstrumentedAsyncQueuePool,
+        echo=settings.DATABASE_ECHO,
+        **get_pool_options()
+    )
+    async_replica_engine.sync_engine.pool.stats = PoolStats("replica_async")
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReplicaSessionLocal = (
+    sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+    if replica_engine else None
+)
+
+# Create AsyncSessionLocal class
+# expire_on_commit=False: attributes stay loaded after commit, so serialization
+# doesn't trigger implicit IO (lazy loading is not allowed with AsyncSession)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+AsyncReplicaSessionLocal = (
+    async_sessionmaker(
+        async_replica_engine,
+        class_=AsyncSession,
+        autoflush=False,
+        expire_on_commit=False
+    )
+    if async_replica_engine else None
+)
 
 # Create Base class for models
 Base = declarative_base()
@@ -24,3 +158,17 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """Dependency for getting async database session"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def get_pool_statistics() -> list:
+    """Statistics for all connection pools of this worker"""
+    pools = [engine.pool, async_engine.sync_engine.pool]
+    if replica_engine:
+        pools += [replica_engine.pool, async_replica_engine.sync_engine.pool]
+    return [pool.stats.snapshot(pool) for pool in pools]
@@ -0,0 +1,136 @@
+"""
+Read replica routing for read-only endpoints
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from fastapi import Request
+from sqlalchemy import exc
+
+from app.core.config import settings
+from app.core.database import (
+    AsyncReplicaSessionLocal,
+    AsyncSessionLocal,
+    ReplicaSessionLocal,
+    SessionLocal,
+)
+from app.core.security import get_token_subject
+
+# Users with a recent write (user_id -> monotonic time of write), per worker
+_recent_writes: "OrderedDict[int, float]" = OrderedDict()
+_RECENT_WRITES_MAX = 10000
+
+# Replica is skipped until this monotonic time after a connection failure
+_replica_down_until = 0.0
+
+# Monotonic time of the last catalog change in this worker
+_catalog_written_at = float("-inf")
+
+_CONNECTION_ERRORS = (exc.DBAPIError, OSError, asyncio.TimeoutError)
+
+
+def mark_user_write(user_id: int) -> None:
+    """Route this user's reads to primary for the read-your-writes window"""
+    _recent_writes[user_id] = time.monotonic()
+    _recent_writes.move_to_end(user_id)
+    while len(_recent_writes) > _RECENT_WRITES_MAX:
+        _recent_writes.popitem(last=False)
+
+
+def has_recent_write(user_id: int) -> bool:
+    """Check if user wrote within the read-your-writes window"""
+    written_at = _recent_writes.get(user_id)
+    if written_at is None:
+        return False
+    if time.monotonic() - written_at > settings.DB_REPLICA_READ_YOUR_WRITES_SECONDS:
+        _recent_writes.pop(user_id, None)
+        return False
+    return True
+
+
+def mark_catalog_write() -> None:
+    """Fill the catalog cache from primary for the read-your-writes window"""
+    global _catalog_written_at
+    _catalog_written_at = time.monotonic()
+
+
+def has_recent_catalog_write() -> bool:
+    """Check if the catalog changed within the read-your-writes window"""
+    return time.monotonic() - _catalog_written_at <= settings.DB_REPLICA_READ_YOUR_WRITES_SECONDS
+
+
+def _mark_replica_down() -> None:
+    global _replica_down_until
+    _replica_down_until = time.monotonic() + settings.DB_REPLICA_RETRY_SECONDS
+
+
+def use_replica(request: Request) -> bool:
+    """Decide whether a read-only request may be served by the replica"""
+    if ReplicaSessionLocal is None or time.monotonic() < _replica_down_until:
+        return False
+    user_id = get_token_subject(request.headers.get("Authorization"))
+    return not (user_id and has_recent_write(user_id))
+
+
+def get_read_db(request: Request):
+    """Dependency for read-only database session (replica with fallback to primary)"""
+    db = None
+    if use_replica(request):
+        db = ReplicaSessionLocal()
+        try:
+            db.connection()
+        except _CONNECTION_ERRORS:
+            _mark_replica_down()
+            db.close()
+            db = None
+    if db is None:
+        db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def _async_read_session(replica: bool):
+    db = None
+    if replica:
+        db = AsyncReplicaSessionLocal()
+        try:
+            await db.connection()
+        except _CONNECTION_ERRORS:
+            _mark_replica_down()
+            await db.close()
+            db = None
+    if db is None:
+        db = AsyncSessionLocal()
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
+async def get_async_read_db(request: Request):
+    """Dependency for read-only async database session (replica with fallback to primary)"""
+    async for db in _async_read_session(use_replica(request)):
+        yield db
+
+
+async def get_async_catalog_db(request: Request):
+    """
+    Dependency for catalog reads that fill the catalog cache
+
+    Like get_async_read_db, but right after a catalog change the replica may
+    still lag behind: reads go to primary so the cache isn't refilled with
+    the old data.
+    """
+    async for db in _async_read_session(use_replica(request) and not has_recent_catalog_write()):
+        yield db
+
+
+def get_write_subject(request: Request) -> Optional[int]:
+    """User ID of a successful write request (for read-your-writes tracking)"""
+    if request.method in ("GET", "HEAD", "OPTIONS"):
+        return None
+    return get_token_subject(request.headers.get("Authorization"))
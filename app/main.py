@@ -1,11 +1,23 @@
-from fastapi import FastAPI
+import asyncio
+import contextlib
+import logging
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
 
+from app.core.compression import CompressionMiddleware
 from app.core.config import settings
-from app.core.database import engine
+from app.core.database import engine, async_engine, logger as db_logger, start_query_stats
+from app.core.replica import get_write_subject, mark_user_write
 from app.api import api_router
+from app.services.images import image_processor
+from app.services.reservations import run_reservation_sweeper
+from app.utils.static_files import CachedStaticFiles
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logging.getLogger("app").setLevel(logging.DEBUG if settings.DEBUG else logging.INFO)
 
 
 @asynccontextmanager
@@ -13,9 +25,19 @@ async def lifespan(app: FastAPI):
     """Lifecycle manager for FastAPI application"""
     # Startup
     print("🚀 Starting DWC Shop Backend...")
+    sweeper = None
+    if settings.STOCK_RESERVATIONS_ENABLED:
+        # Each worker sweeps; concurrent sweeps skip each other's rows
+        sweeper = asyncio.create_task(run_reservation_sweeper())
     yield
     # Shutdown
     print("👋 Shutting down DWC Shop Backend...")
+    if sweeper:
+        sweeper.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await sweeper
+    image_processor.shutdown()
+    await async_engine.dispose()
 
 
 app = FastAPI(
@@ -23,6 +45,7 @@ app = FastAPI(
     description="Backend для интернет-магазина дизайнерской одежды",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
     docs_url="/docs",
     redoc_url="/redoc",
 )
@@ -34,10 +57,54 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # cursor pagination of admin lists (users, promo codes)
+)
+
+# Compression
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MIN_SIZE,
+    content_types=settings.COMPRESSION_CONTENT_TYPES,
+    brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
 )
 
-# Static files
-app.mount("/static", StaticFiles(directory="static"), name="static")
+
+@app.middleware("http")
+async def track_user_writes(request: Request, call_next):
+    """Remember users who just wrote, so their reads skip the replica"""
+    response = await call_next(request)
+    if settings.DATABASE_REPLICA_URL and response.status_code < 400:
+        user_id = get_write_subject(request)
+        if user_id:
+            mark_user_write(user_id)
+    return response
+
+
+@app.middleware("http")
+async def sql_query_stats(request: Request, call_next):
+    """Count SQL statements and DB time per request (Server-Timing header)"""
+    if not settings.SQL_STATS_ENABLED:
+        return await call_next(request)
+
+    stats = start_query_stats()
+    response = await call_next(request)
+    response.headers["Server-Timing"] = stats.server_timing()
+    db_logger.debug(
+        "%s %s: %d queries, %.1f ms",
+        request.method, request.url.path, stats.count, stats.duration_ms
+    )
+    for statement, count in stats.repeated(settings.SQL_N_PLUS_ONE_THRESHOLD):
+        db_logger.warning(
+            "Possible N+1 in %s %s: statement executed %d times: %.200s",
+            request.method, request.url.path, count, statement
+        )
+    return response
+
+
+# Static files (in production Caddy serves /static from the shared volume)
+if settings.STATIC_SERVED_BY_APP:
+    app.mount("/static", CachedStaticFiles(directory="static"), name="static")
 
 # Include API router
 app.include_router(api_router, prefix="/api/v1")
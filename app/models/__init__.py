@@ -6,6 +6,7 @@ from app.models.splash import SplashNotification
 from app.models.promo_code import PromoCode
 from app.models.page import Page
 from app.models.preorder import PreorderStatus, PreorderWave
+from app.models.reservation import StockReservation
 
 __all__ = [
     "User",
@@ -20,4 +21,5 @@ __all__ = [
     "Page",
     "PreorderStatus",
     "PreorderWave",
+    "StockReservation",
 ]
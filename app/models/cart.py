@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -27,10 +27,14 @@ class Cart(Base):
 class CartItem(Base):
     """Cart item - позиции в корзине"""
     __tablename__ = "cart_items"
+    __table_args__ = (
+        # One row per product and size; add_item_to_cart upserts on it
+        UniqueConstraint("cart_id", "product_id", "size", name="uq_cart_items_cart_id_product_id_size"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     cart_id = Column(Integer, ForeignKey("carts.id"), nullable=False)
-    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False, index=True)
 
     # Item details
     size = Column(String(50), nullable=False)
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, Text, Float, Boolean, DateTime, Enum, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Text, Float, Boolean, DateTime, Enum, ForeignKey, JSON, Index, Computed
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.ext.hybrid import hybrid_property
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
 from datetime import datetime
 import enum
 
@@ -28,9 +29,22 @@ class SizeType(str, enum.Enum):
     BIG = "Big"
 
 
+# Full-text search document: name and article weigh more than description
+PRODUCT_SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('russian', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(article, '')), 'A') || "
+    "setweight(to_tsvector('russian', coalesce(description, '')), 'B')"
+)
+
+
 class Product(Base):
     """Product model - товары"""
     __tablename__ = "products"
+    __table_args__ = (
+        Index("ix_products_is_active_is_archived_id", "is_active", "is_archived", "id"),
+        Index("ix_products_listing_created_at_id", "is_active", "is_archived", "created_at", "id"),
+        Index("ix_products_search_vector", "search_vector", postgresql_using="gin"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     
@@ -41,7 +55,7 @@ class Product(Base):
     price = Column(Float, nullable=False)
 
     # Preview image for product cards
-    preview_image_url = Column(String(500), nullable=True)
+    preview_image_url = Column(String(500), nullable=True, index=True)
     
     # Size and care
     oki_quantity = Column(Integer, default=0, nullable=False)  # Количество размера OKI
@@ -73,6 +87,9 @@ class Product(Base):
     is_active = Column(Boolean, default=True)
     is_archived = Column(Boolean, default=False)
     
+    # Full-text search (generated column, not loaded by default)
+    search_vector = deferred(Column(TSVECTOR, Computed(PRODUCT_SEARCH_VECTOR_SQL, persisted=True)))
+    
     # Timestamps
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -92,10 +109,10 @@ class ProductMedia(Base):
     __tablename__ = "product_media"
 
     id = Column(Integer, primary_key=True, index=True)
-    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False, index=True)
     
     # Media info
-    url = Column(String(500), nullable=False)
+    url = Column(String(500), nullable=False, index=True)  # Indexed for media reference counting
     order = Column(Integer, default=0)  # Порядок в карусели
     
     # Timestamps
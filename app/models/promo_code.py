@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Table, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Table, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -16,6 +16,9 @@ promo_code_products = Table(
 class PromoCode(Base):
     """Promo code model - промокоды"""
     __tablename__ = "promo_codes"
+    __table_args__ = (
+        Index("ix_promo_codes_created_at_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     
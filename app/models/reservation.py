@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, UniqueConstraint
+from datetime import datetime
+
+from app.core.database import Base
+
+
+class StockReservation(Base):
+    """Stock reservation - товар, отложенный из корзины до оформления заказа"""
+    __tablename__ = "stock_reservations"
+    __table_args__ = (
+        # One hold per user, product and size; cart endpoints upsert on it
+        UniqueConstraint("user_id", "product_id", "size", name="uq_stock_reservations_user_id_product_id_size"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False, index=True)
+
+    # Held units are already subtracted from products.oki_quantity / big_quantity
+    size = Column(String(50), nullable=False)
+    quantity = Column(Integer, nullable=False, default=0)
+
+    # Timestamps
+    expires_at = Column(DateTime, nullable=False, index=True)  # sweeper returns expired holds to stock
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<StockReservation {self.quantity} x {self.product_id}/{self.size} for User {self.user_id}>"
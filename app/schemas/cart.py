@@ -1,7 +1,9 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Literal
 from datetime import datetime
 
+from app.schemas.product import ProductResponse
+
 
 class CartItemBase(BaseModel):
     product_id: int
@@ -40,6 +42,7 @@ class CartItemWithProductResponse(CartItemResponse):
     product_name: str
     product_price: float
     product_article: str
+    product: Optional[ProductResponse] = None  # Product data
 
     class Config:
         from_attributes = True
@@ -55,4 +58,34 @@ class CartWithProductsResponse(BaseModel):
     total_amount: float = 0.0
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+class CartBatchOperation(BaseModel):
+    action: Literal["add", "update", "remove"]  # add - прибавить, update - установить количество
+    product_id: int
+    size: str
+    quantity: int = Field(default=1, ge=1)  # Не используется для remove
+
+
+class CartBatchRequest(BaseModel):
+    operations: List[CartBatchOperation] = Field(..., min_length=1, max_length=100)
+
+
+class CartSummaryLine(BaseModel):
+    item_id: int
+    product_id: int
+    size: str
+    quantity: int
+    price: float
+    available_quantity: Optional[int] = None  # Остаток размера; None для предзаказа
+    is_available: bool  # Товар активен и позицию можно заказать в указанном количестве
+
+
+class CartSummaryResponse(BaseModel):
+    """Лёгкая сводка корзины (бейдж в шапке): без описаний и медиа товаров"""
+    lines_count: int = 0
+    total_items: int = 0
+    total_amount: float = 0.0
+    has_unavailable: bool = False
+    lines: List[CartSummaryLine] = []
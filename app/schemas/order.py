@@ -74,6 +74,8 @@ class OrderResponse(BaseModel):
 
 class OrderListResponse(BaseModel):
     orders: List[OrderResponse]
-    total: int
-    page: int
+    total: Optional[int] = None  # None в режиме курсора или total_mode=none
+    total_estimated: bool = False  # total - оценка планировщика
+    page: Optional[int] = None
     page_size: int
+    next_cursor: Optional[str] = None
@@ -1,7 +1,9 @@
-from pydantic import BaseModel, Field
-from typing import Optional, List, Dict, Any
+from pydantic import BaseModel, Field, computed_field
+from typing import Optional, List, Dict, Any, Literal
 from datetime import datetime
 
+from app.services.images import variant_urls
+
 
 class ProductMediaBase(BaseModel):
     url: str
@@ -11,6 +13,11 @@ class ProductMediaBase(BaseModel):
 class ProductMediaResponse(ProductMediaBase):
     id: int
     created_at: datetime
+
+    @computed_field(description="URL уменьшенных копий: {thumb|card|carousel: {webp, jpeg}}")
+    @property
+    def variants(self) -> Dict[str, Dict[str, str]]:
+        return variant_urls(self.url)
     
     class Config:
         from_attributes = True
@@ -69,12 +76,116 @@ class ProductResponse(ProductBase):
     media: List[ProductMediaResponse] = []
     sizes: Dict[str, int]  # Для совместимости с фронтендом
 
+    @computed_field(description="URL уменьшенных копий превью: {thumb|card|carousel: {webp, jpeg}}")
+    @property
+    def preview_image_variants(self) -> Dict[str, Dict[str, str]]:
+        return variant_urls(self.preview_image_url)
+
+    class Config:
+        from_attributes = True
+
+
+class ProductCardResponse(BaseModel):
+    """Карточка товара для списков (без описания, таблицы размеров и ухода)"""
+    id: int
+    name: str
+    article: str
+    price: float
+    preview_image_url: Optional[str] = None
+    order_type: str
+    stock_count: int
+    sizes: Dict[str, int]
+    is_active: bool
+    is_archived: bool
+    created_at: datetime
+    updated_at: datetime
+    media: List[ProductMediaResponse] = []
+
+    @computed_field(description="URL уменьшенных копий превью: {thumb|card|carousel: {webp, jpeg}}")
+    @property
+    def preview_image_variants(self) -> Dict[str, Dict[str, str]]:
+        return variant_urls(self.preview_image_url)
+
     class Config:
         from_attributes = True
 
 
+class ProductCardListResponse(BaseModel):
+    products: List[ProductCardResponse]
+    total: Optional[int] = None  # None в режиме курсора или total_mode=none
+    total_estimated: bool = False  # total - оценка планировщика
+    page: Optional[int] = None
+    page_size: int
+    next_cursor: Optional[str] = None
+
+
 class ProductListResponse(BaseModel):
+    products: List[ProductResponse]
+    total: Optional[int] = None  # None в режиме курсора или total_mode=none
+    total_estimated: bool = False  # total - оценка планировщика
+    page: Optional[int] = None
+    page_size: int
+    next_cursor: Optional[str] = None
+
+
+class PriceRangeFacet(BaseModel):
+    price_from: Optional[float] = None
+    price_to: Optional[float] = None
+    count: int
+
+
+class ProductSearchFacets(BaseModel):
+    order_type: Dict[str, int] = {}  # Количество товаров по типу заказа
+    price_min: Optional[float] = None
+    price_max: Optional[float] = None
+    price_ranges: List[PriceRangeFacet] = []
+
+
+class ProductSearchResponse(BaseModel):
     products: List[ProductResponse]
     total: int
     page: int
     page_size: int
+    facets: ProductSearchFacets
+
+
+class ProductImportRow(ProductCreate):
+    """Строка импорта товаров (CSV/JSONL), upsert по артикулу"""
+    is_active: bool = True
+    is_archived: bool = False
+
+
+class ProductImportRowError(BaseModel):
+    row: int  # Номер строки файла (с 1, для CSV без учёта заголовка)
+    article: Optional[str] = None
+    errors: List[str]
+
+
+class ProductImportResult(BaseModel):
+    dry_run: bool
+    committed: bool  # False при dry_run или ошибках в строках
+    total_rows: int
+    created: int
+    updated: int
+    errors: List[ProductImportRowError] = []
+
+
+class StockAdjustmentItem(BaseModel):
+    article: str
+    size: Literal["OKI", "BIG"]
+    delta: int = Field(..., description="Изменение остатка (может быть отрицательным)")
+
+
+class StockAdjustmentRequest(BaseModel):
+    items: List[StockAdjustmentItem] = Field(..., min_length=1, max_length=10000)
+
+
+class StockLevel(BaseModel):
+    id: int
+    article: str
+    oki_quantity: int
+    big_quantity: int
+
+
+class StockAdjustmentResponse(BaseModel):
+    products: List[StockLevel]
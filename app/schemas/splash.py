@@ -28,7 +28,8 @@ class SplashNotificationResponse(SplashNotificationBase):
 
 class SplashNotificationListResponse(BaseModel):
     notifications: list[SplashNotificationResponse]
-    total: int
+    total: Optional[int] = None  # None при total_mode=none
+    total_estimated: bool = False
     page: int
     page_size: int
 
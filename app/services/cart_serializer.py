@@ -0,0 +1,90 @@
+"""
+Cart serialization shared by the cart router
+
+Cart and item fields are read straight from ORM attributes; the nested
+product object is validated once per product version through a prebuilt
+TypeAdapter and reused from cache for other carts.
+"""
+from typing import Hashable
+
+from fastapi import status
+from fastapi.responses import ORJSONResponse
+from pydantic import TypeAdapter
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.schemas.product import ProductResponse
+
+_product_adapter = TypeAdapter(ProductResponse)
+
+# JSON-ready ProductResponse dicts keyed by product version (per worker)
+product_fragments = TTLCache(
+    maxsize=settings.CATALOG_CACHE_MAX_PRODUCTS,
+    ttl=settings.CART_PRODUCT_FRAGMENT_TTL_SECONDS
+)
+
+
+def product_version(product) -> Hashable:
+    """
+    Version key of a product with loaded media
+
+    updated_at changes with every product row update (including stock);
+    media ids change when the gallery is replaced.
+    """
+    return (product.id, product.updated_at, tuple(media.id for media in product.media))
+
+
+def product_fragment(product) -> dict:
+    """ProductResponse of a product as a JSON-ready dict (shared, must not be mutated)"""
+    key = product_version(product)
+    fragment = product_fragments.get(key)
+    if fragment is None:
+        fragment = _product_adapter.dump_python(
+            _product_adapter.validate_python(product, from_attributes=True),
+            mode="json"
+        )
+        product_fragments.set(key, fragment)
+    return fragment
+
+
+def cart_item_payload(item, product) -> dict:
+    """
+    CartItemWithProductResponse as a dict
+
+    item may be a CartItem or a RETURNING row with the same columns.
+    """
+    return {
+        "id": item.id,
+        "product_id": item.product_id,
+        "size": item.size,
+        "quantity": item.quantity,
+        "created_at": item.created_at,
+        "product_name": product.name,
+        "product_price": product.price,
+        "product_article": product.article,
+        "product": product_fragment(product),
+    }
+
+
+def cart_payload(cart) -> dict:
+    """CartWithProductsResponse as a dict (items with products and media loaded)"""
+    items = [cart_item_payload(item, item.product) for item in cart.items]
+    return {
+        "id": cart.id,
+        "user_id": cart.user_id,
+        "created_at": cart.created_at,
+        "updated_at": cart.updated_at,
+        "items": items,
+        "total_items": sum(item["quantity"] for item in items),
+        "total_amount": sum((item["quantity"] * item["product_price"] for item in items), 0.0),
+    }
+
+
+def cart_response(cart) -> ORJSONResponse:
+    """Serialized cart; bypasses response_model re-validation"""
+    return ORJSONResponse(cart_payload(cart))
+
+
+def cart_item_response(item, product, status_code: int = status.HTTP_200_OK) -> ORJSONResponse:
+    """Serialized cart item; bypasses response_model re-validation"""
+    return ORJSONResponse(cart_item_payload(item, product), status_code=status_code)
@@ -0,0 +1,65 @@
+"""
+In-process cache of serialized product payloads
+"""
+from typing import Hashable, Iterable, Optional
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.replica import mark_catalog_write
+from app.utils.counting import invalidate_counts
+
+
+class CatalogCache:
+    """Cache for GET /products and GET /products/{id} responses (JSON bytes)"""
+    
+    def __init__(self):
+        self.products = TTLCache(
+            maxsize=settings.CATALOG_CACHE_MAX_PRODUCTS,
+            ttl=settings.CATALOG_CACHE_TTL_SECONDS
+        )
+        self.lists = TTLCache(
+            maxsize=settings.CATALOG_CACHE_MAX_LISTS,
+            ttl=settings.CATALOG_CACHE_TTL_SECONDS
+        )
+    
+    def get_product(self, product_id: int) -> Optional[bytes]:
+        return self.products.get(product_id)
+    
+    def set_product(self, product_id: int, payload: bytes) -> None:
+        self.products.set(product_id, payload)
+    
+    def get_list(self, key: Hashable) -> Optional[bytes]:
+        return self.lists.get(key)
+    
+    def set_list(self, key: Hashable, payload: bytes) -> None:
+        self.lists.set(key, payload)
+    
+    def invalidate_products(self, product_ids: Iterable[int]) -> None:
+        """
+        Drop cached products after they were changed
+        
+        Any product change may affect any list page, so all lists are dropped too.
+        Other workers see the change after CATALOG_CACHE_TTL_SECONDS.
+        This worker refills the cache from primary until the replica catches up.
+        """
+        mark_catalog_write()
+        for product_id in product_ids:
+            self.products.delete(product_id)
+        invalidate_counts("products")
+        self.lists.clear()
+    
+    def clear(self) -> None:
+        mark_catalog_write()
+        self.products.clear()
+        self.lists.clear()
+        invalidate_counts("products")
+    
+    def stats(self) -> dict:
+        return {
+            "products": self.products.stats(),
+            "lists": self.lists.stats(),
+        }
+
+
+# Singleton instance
+catalog_cache = CatalogCache()
@@ -0,0 +1,166 @@
+"""
+Image derivative pipeline: resized WebP/JPEG variants of product images
+"""
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+
+# Variant name -> max width (px); images are never upscaled
+IMAGE_VARIANTS = {
+    "thumb": 200,
+    "card": 600,
+    "carousel": 1200,
+}
+
+# Output format -> (Pillow format, file extension)
+IMAGE_FORMATS = {
+    "webp": ("WEBP", "webp"),
+    "jpeg": ("JPEG", "jpg"),
+}
+
+# Vector images are served as is (no raster variants)
+VECTOR_EXTENSIONS = {".svg"}
+
+
+class ImageProcessingError(Exception):
+    """Uploaded file can't be decoded as an image"""
+
+
+def has_variants(path: str) -> bool:
+    """Whether raster variants are generated for a file"""
+    return os.path.splitext(path)[1].lower() not in VECTOR_EXTENSIONS
+
+
+def variant_path(original: str, variant: str, image_format: str) -> str:
+    """Path or URL of a variant stored next to the original"""
+    stem = os.path.splitext(original)[0]
+    return f"{stem}_{variant}.{IMAGE_FORMATS[image_format][1]}"
+
+
+def variant_urls(url: Optional[str]) -> Dict[str, Dict[str, str]]:
+    """
+    Variant URLs of an uploaded image
+
+    Returns:
+        {"card": {"webp": url, "jpeg": url}, ...} or {} for external URLs
+    """
+    upload_prefix = "/" + settings.UPLOAD_DIR.strip("/") + "/"
+    if not url or not url.startswith(upload_prefix) or not has_variants(url):
+        return {}
+    return {
+        variant: {image_format: variant_path(url, variant, image_format) for image_format in IMAGE_FORMATS}
+        for variant in IMAGE_VARIANTS
+    }
+
+
+def all_variant_paths(path: str) -> List[str]:
+    """Paths of all variants of an original file"""
+    return [
+        variant_path(path, variant, image_format)
+        for variant in IMAGE_VARIANTS
+        for image_format in IMAGE_FORMATS
+    ]
+
+
+def generate_variants(path: str, quality: int) -> List[str]:
+    """
+    Generate all variants of an image file (runs in worker process)
+
+    Returns:
+        Paths of generated files
+    """
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    try:
+        with Image.open(path) as source:
+            image = ImageOps.exif_transpose(source)
+            image.load()
+    except (UnidentifiedImageError, OSError) as e:
+        raise ImageProcessingError(f"Не удалось прочитать изображение: {e}")
+
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+
+    created = []
+    for variant, width in IMAGE_VARIANTS.items():
+        resized = image.copy()
+        resized.thumbnail((width, width * 4), Image.LANCZOS)
+        for image_format, (pil_format, _) in IMAGE_FORMATS.items():
+            output = resized
+            if pil_format == "JPEG" and resized.mode == "RGBA":
+                # JPEG has no alpha channel - flatten onto white
+                output = Image.new("RGB", resized.size, (255, 255, 255))
+                output.paste(resized, mask=resized.getchannel("A"))
+            target = variant_path(path, variant, image_format)
+            tmp_target = target + ".tmp"
+            output.save(tmp_target, format=pil_format, quality=quality, optimize=True)
+            os.replace(tmp_target, target)
+            created.append(target)
+    return created
+
+
+class ImageProcessor:
+    """Runs variant generation in a process pool, off the event loop"""
+
+    def __init__(self):
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: don't fork the running server with its threads and event loop
+            self._executor = ProcessPoolExecutor(
+                max_workers=settings.IMAGE_PROCESS_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    async def process(self, paths: List[str]) -> None:
+        """
+        Generate variants for image files in parallel
+
+        Raises:
+            ImageProcessingError if any file isn't a readable image
+        """
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        await asyncio.gather(*(
+            loop.run_in_executor(executor, generate_variants, path, settings.IMAGE_QUALITY)
+            for path in paths
+            if has_variants(path)
+        ))
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Singleton instance
+image_processor = ImageProcessor()
+
+
+def generate_missing_variants() -> None:
+    """Generate variants for uploaded images that don't have them yet"""
+    suffixes = tuple(f"_{variant}" for variant in IMAGE_VARIANTS)
+    for name in sorted(os.listdir(settings.UPLOAD_DIR)):
+        path = os.path.join(settings.UPLOAD_DIR, name)
+        stem = os.path.splitext(name)[0]
+        if name.startswith(".") or stem.endswith(suffixes) or name.endswith((".br", ".gz")):
+            continue
+        if not has_variants(name) or not os.path.isfile(path):
+            continue
+        if all(os.path.exists(variant) for variant in all_variant_paths(path)):
+            continue
+        try:
+            generate_variants(path, settings.IMAGE_QUALITY)
+            print(f"✅ {name}")
+        except ImageProcessingError as e:
+            print(f"❌ {name}: {e}")
+
+
+if __name__ == "__main__":
+    generate_missing_variants()
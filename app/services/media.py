@@ -0,0 +1,182 @@
+"""
+Media storage service for product images
+"""
+import asyncio
+import gzip
+import hashlib
+import os
+import tempfile
+from typing import Iterable, List, Tuple
+
+import brotli
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.product import Product, ProductMedia
+from app.services.images import all_variant_paths, image_processor
+from app.utils.static_files import PRECOMPRESSED_ENCODINGS, is_compressible
+
+
+class UploadLimitExceeded(Exception):
+    """Uploaded file or request exceeds configured size limit"""
+
+
+class UploadBudget:
+    """Bytes left for all files of one upload request"""
+
+    def __init__(self, max_bytes: int):
+        self.remaining = max_bytes
+
+    def consume(self, size: int) -> None:
+        self.remaining -= size
+        if self.remaining < 0:
+            raise UploadLimitExceeded(
+                f"Общий размер файлов превышает {settings.UPLOAD_MAX_REQUEST_SIZE // (1024 * 1024)} МБ"
+            )
+
+
+class MediaStorage:
+    """Service for storing uploaded media under static/"""
+
+    def __init__(self):
+        self.upload_dir = settings.UPLOAD_DIR
+        self.url_prefix = "/" + self.upload_dir.strip("/")
+        os.makedirs(self.upload_dir, exist_ok=True)
+
+    def new_budget(self) -> UploadBudget:
+        """Size budget for one upload request"""
+        return UploadBudget(settings.UPLOAD_MAX_REQUEST_SIZE)
+
+    async def save_upload(self, file: UploadFile, budget: UploadBudget, prefix: str = "") -> Tuple[str, bool]:
+        """
+        Stream upload to a temp file in chunks and atomically move it into place
+
+        Files are content-addressed: the name is a hash of the content, so
+        identical images are stored once.
+
+        Args:
+            file: Uploaded file
+            budget: Size budget shared by files of the same request
+            prefix: Filename prefix
+
+        Returns:
+            Public URL of stored file and whether the file is new
+        """
+        file_extension = os.path.splitext(file.filename or "")[1].lower()
+        digest = hashlib.blake2b(digest_size=16)
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.upload_dir, prefix=".upload-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as buffer:
+                size = 0
+                while chunk := await file.read(settings.UPLOAD_CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > settings.UPLOAD_MAX_FILE_SIZE:
+                        raise UploadLimitExceeded(
+                            f"Файл {file.filename} больше "
+                            f"{settings.UPLOAD_MAX_FILE_SIZE // (1024 * 1024)} МБ"
+                        )
+                    budget.consume(len(chunk))
+                    digest.update(chunk)
+                    # Disk writes run in threadpool to keep the event loop free
+                    await run_in_threadpool(buffer.write, chunk)
+
+            filename = f"{prefix}{digest.hexdigest()}{file_extension}"
+            path = os.path.join(self.upload_dir, filename)
+            created = not os.path.exists(path)
+            if created:
+                await run_in_threadpool(os.replace, tmp_path, path)
+            else:
+                self._remove_path(tmp_path)
+        except BaseException:
+            self._remove_path(tmp_path)
+            raise
+
+        return f"{self.url_prefix}/{filename}", created
+
+    async def save_uploads(self, files: List[UploadFile], prefix: str = "") -> List[str]:
+        """
+        Save several uploads in parallel and generate image variants for new
+        files; on any failure no new file is kept
+
+        Returns:
+            Public URLs in the same order as files
+        """
+        budget = self.new_budget()
+        results = await asyncio.gather(
+            *(self.save_upload(file, budget, prefix) for file in files),
+            return_exceptions=True
+        )
+        saved = [result for result in results if isinstance(result, tuple)]
+        # Files that already existed have variants and may be referenced - never touch them
+        new_urls = list(dict.fromkeys(url for url, created in saved if created))
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if not errors:
+            try:
+                paths = [self.url_to_path(url) for url in new_urls]
+                await image_processor.process(paths)
+                for path in paths:
+                    if is_compressible(path):
+                        await run_in_threadpool(self._precompress, path)
+            except Exception as e:
+                errors.append(e)
+        if errors:
+            for url in new_urls:
+                await self.remove(url)
+            raise errors[0]
+        return [url for url, _ in saved]
+
+    def url_to_path(self, url: str) -> str:
+        """Filesystem path of a /static/... URL"""
+        return os.path.join("static", url.removeprefix("/static/").lstrip("/"))
+
+    async def remove(self, url: str) -> None:
+        """Remove stored file and its variants by URL (missing files and external URLs are ignored)"""
+        if url.startswith("/static/"):
+            path = self.url_to_path(url)
+            compressed = [path + suffix for _, suffix in PRECOMPRESSED_ENCODINGS]
+            for file_path in [path, *all_variant_paths(path), *compressed]:
+                await run_in_threadpool(self._remove_path, file_path)
+
+    async def remove_unreferenced(self, db: AsyncSession, urls: Iterable[str]) -> None:
+        """
+        Remove files no longer referenced by any product media or preview image
+
+        Call after the transaction that dropped the references is committed.
+        """
+        urls = {url for url in urls if url}
+        if not urls:
+            return
+        referenced = set((await db.execute(
+            select(ProductMedia.url).where(ProductMedia.url.in_(urls))
+            .union(select(Product.preview_image_url).where(Product.preview_image_url.in_(urls)))
+        )).scalars())
+        for url in urls - referenced:
+            await self.remove(url)
+
+    @staticmethod
+    def _precompress(path: str) -> None:
+        """Write .br and .gz siblings served to clients that accept them"""
+        with open(path, "rb") as source:
+            data = source.read()
+        for target, content in (
+            (path + ".br", brotli.compress(data, quality=11)),
+            (path + ".gz", gzip.compress(data, compresslevel=9, mtime=0)),
+        ):
+            with open(target + ".tmp", "wb") as output:
+                output.write(content)
+            os.replace(target + ".tmp", target)
+
+    @staticmethod
+    def _remove_path(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass  # Ignore if file doesn't exist or can't be removed
+
+
+# Singleton instance
+media_storage = MediaStorage()
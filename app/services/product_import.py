@@ -0,0 +1,312 @@
+"""
+Bulk product import (CSV/JSONL upsert by article) and streaming export
+"""
+import csv
+import io
+import json
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterator, List, Literal, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import delete, insert, literal_column, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.core.database import AsyncSessionLocal
+from app.models.product import Product, ProductMedia, OrderType
+from app.schemas.product import ProductImportRow, ProductImportRowError
+
+ImportFormat = Literal["csv", "jsonl"]
+
+# Column order of CSV export (import accepts the same header)
+PRODUCT_EXPORT_COLUMNS = (
+    "article",
+    "name",
+    "description",
+    "price",
+    "oki_quantity",
+    "big_quantity",
+    "order_type",
+    "preorder_waves_total",
+    "preorder_wave_capacity",
+    "size_table",
+    "care_instructions",
+    "preview_image_url",
+    "media_urls",
+    "is_active",
+    "is_archived",
+)
+
+# Separator of media URLs inside one CSV cell
+MEDIA_URLS_SEPARATOR = "|"
+
+# Rows per INSERT ... ON CONFLICT statement (~16 params per row, asyncpg allows 32767)
+IMPORT_BATCH_SIZE = 500
+
+# Rows per chunk of streaming export
+EXPORT_BATCH_SIZE = 500
+
+# Columns overwritten when a product with the same article exists;
+# counters of preorder waves and created_at are kept
+UPSERT_COLUMNS = (
+    "name",
+    "description",
+    "price",
+    "oki_quantity",
+    "big_quantity",
+    "size_table",
+    "care_instructions",
+    "preview_image_url",
+    "order_type",
+    "preorder_waves_total",
+    "preorder_wave_capacity",
+    "is_active",
+    "is_archived",
+    "updated_at",
+)
+
+
+def _parse_csv_row(raw: Dict[str, str]) -> dict:
+    """Convert CSV cells to import row fields (empty cells use defaults)"""
+    data = {key: value for key, value in raw.items() if key and value not in (None, "")}
+    if "size_table" in data:
+        data["size_table"] = json.loads(data["size_table"])
+    if "media_urls" in raw:
+        # Column present - media list is replaced, even when the cell is empty
+        data["media_urls"] = [url.strip() for url in (raw["media_urls"] or "").split(MEDIA_URLS_SEPARATOR) if url.strip()]
+    return data
+
+
+def parse_import_file(content: bytes, file_format: ImportFormat) -> Iterator[Tuple[int, dict]]:
+    """
+    Parse import file into raw rows
+
+    Yields:
+        (row number, row data); a row that can't be parsed is yielded as ValueError
+    """
+    text = content.decode("utf-8-sig")
+    if file_format == "csv":
+        for row_number, raw in enumerate(csv.DictReader(io.StringIO(text)), start=1):
+            try:
+                yield row_number, _parse_csv_row(raw)
+            except ValueError as e:
+                yield row_number, ValueError(f"size_table: {e}")
+    else:
+        for row_number, line in enumerate(text.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                data = json.loads(line)
+            except ValueError as e:
+                yield row_number, ValueError(f"Некорректный JSON: {e}")
+                continue
+            if not isinstance(data, dict):
+                yield row_number, ValueError("Строка должна быть JSON-объектом")
+                continue
+            yield row_number, data
+
+
+def validate_import_rows(
+    content: bytes,
+    file_format: ImportFormat
+) -> Tuple[int, List[ProductImportRow], List[ProductImportRowError]]:
+    """
+    Validate all rows of an import file
+
+    Returns:
+        (total rows, valid rows, per-row errors)
+    """
+    total_rows = 0
+    rows = []
+    errors = []
+    seen_articles: Dict[str, int] = {}
+
+    for row_number, data in parse_import_file(content, file_format):
+        total_rows += 1
+        if isinstance(data, ValueError):
+            errors.append(ProductImportRowError(row=row_number, errors=[str(data)]))
+            continue
+
+        article = data.get("article")
+        try:
+            row = ProductImportRow(**data)
+        except ValidationError as e:
+            errors.append(ProductImportRowError(
+                row=row_number,
+                article=article if isinstance(article, str) else None,
+                errors=[f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}" for err in e.errors()]
+            ))
+            continue
+
+        row_errors = []
+        if row.order_type not in {order_type.value for order_type in OrderType}:
+            row_errors.append(f"order_type: неизвестный тип заказа '{row.order_type}'")
+        if row.article in seen_articles:
+            row_errors.append(f"article: дублирует строку {seen_articles[row.article]}")
+        else:
+            seen_articles[row.article] = row_number
+        if row_errors:
+            errors.append(ProductImportRowError(row=row_number, article=row.article, errors=row_errors))
+            continue
+
+        rows.append(row)
+
+    return total_rows, rows, errors
+
+
+async def count_existing_articles(db: AsyncSession, articles: List[str]) -> int:
+    """Number of articles that already exist (would be updated)"""
+    existing = 0
+    for start in range(0, len(articles), IMPORT_BATCH_SIZE):
+        batch = articles[start:start + IMPORT_BATCH_SIZE]
+        existing += len((await db.execute(
+            select(Product.id).where(Product.article.in_(batch))
+        )).all())
+    return existing
+
+
+async def upsert_products(db: AsyncSession, rows: List[ProductImportRow]) -> Tuple[int, int, List[str]]:
+    """
+    Upsert products by article in batched INSERT ... ON CONFLICT statements
+
+    Runs in the caller's transaction; the caller commits.
+
+    Returns:
+        (created, updated, media URLs that lost their reference)
+    """
+    created = 0
+    updated = 0
+    released_urls: List[str] = []
+    now = datetime.utcnow()
+
+    for start in range(0, len(rows), IMPORT_BATCH_SIZE):
+        batch = rows[start:start + IMPORT_BATCH_SIZE]
+        articles = [row.article for row in batch]
+
+        # Previews that may be replaced by this batch
+        released_urls.extend((await db.execute(
+            select(Product.preview_image_url).where(
+                Product.article.in_(articles),
+                Product.preview_image_url.is_not(None)
+            )
+        )).scalars())
+
+        values = [
+            {
+                "article": row.article,
+                "name": row.name,
+                "description": row.description,
+                "price": row.price,
+                "oki_quantity": row.oki_quantity,
+                "big_quantity": row.big_quantity,
+                "size_table": row.size_table,
+                "care_instructions": row.care_instructions,
+                "preview_image_url": row.preview_image_url,
+                "order_type": OrderType(row.order_type),
+                "preorder_waves_total": row.preorder_waves_total,
+                "preorder_wave_capacity": row.preorder_wave_capacity,
+                "current_wave": 1,
+                "current_wave_count": 0,
+                "is_active": row.is_active,
+                "is_archived": row.is_archived,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for row in batch
+        ]
+        stmt = pg_insert(Product).values(values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Product.article],
+            set_={column: stmt.excluded[column] for column in UPSERT_COLUMNS}
+        ).returning(
+            Product.id,
+            Product.article,
+            # xmax = 0 only for freshly inserted rows
+            literal_column("(xmax = 0)").label("inserted")
+        )
+        result = (await db.execute(stmt)).all()
+        product_ids = {article: product_id for product_id, article, _ in result}
+        batch_created = sum(1 for *_, inserted in result if inserted)
+        created += batch_created
+        updated += len(result) - batch_created
+
+        # Replace media only for rows that list it
+        media_rows = [row for row in batch if "media_urls" in row.model_fields_set]
+        if media_rows:
+            media_product_ids = [product_ids[row.article] for row in media_rows]
+            released_urls.extend((await db.execute(
+                delete(ProductMedia)
+                .where(ProductMedia.product_id.in_(media_product_ids))
+                .returning(ProductMedia.url)
+            )).scalars())
+            media_values = [
+                {"product_id": product_ids[row.article], "url": url, "order": idx, "created_at": now}
+                for row in media_rows
+                for idx, url in enumerate(row.media_urls)
+            ]
+            if media_values:
+                await db.execute(insert(ProductMedia), media_values)
+
+    return created, updated, released_urls
+
+
+def _export_row(product: Product) -> dict:
+    return {
+        "article": product.article,
+        "name": product.name,
+        "description": product.description,
+        "price": product.price,
+        "oki_quantity": product.oki_quantity,
+        "big_quantity": product.big_quantity,
+        "order_type": product.order_type.value,
+        "preorder_waves_total": product.preorder_waves_total,
+        "preorder_wave_capacity": product.preorder_wave_capacity,
+        "size_table": product.size_table,
+        "care_instructions": product.care_instructions,
+        "preview_image_url": product.preview_image_url,
+        "media_urls": [media.url for media in sorted(product.media, key=lambda m: m.order or 0)],
+        "is_active": product.is_active,
+        "is_archived": product.is_archived,
+    }
+
+
+def _format_csv_header() -> str:
+    output = io.StringIO()
+    csv.writer(output).writerow(PRODUCT_EXPORT_COLUMNS)
+    return output.getvalue()
+
+
+def _format_csv(rows: List[dict]) -> str:
+    output = io.StringIO()
+    writer = csv.writer(output)
+    for row in rows:
+        row["size_table"] = json.dumps(row["size_table"], ensure_ascii=False) if row["size_table"] is not None else ""
+        row["media_urls"] = MEDIA_URLS_SEPARATOR.join(row["media_urls"])
+        writer.writerow(["" if row[column] is None else row[column] for column in PRODUCT_EXPORT_COLUMNS])
+    return output.getvalue()
+
+
+async def export_products(file_format: ImportFormat) -> AsyncIterator[str]:
+    """
+    Stream all products in import format, EXPORT_BATCH_SIZE rows at a time
+
+    Opens its own session: the response body is produced after request
+    dependencies are closed.
+    """
+    if file_format == "csv":
+        # BOM so that Excel detects UTF-8
+        yield "\ufeff" + _format_csv_header()
+    async with AsyncSessionLocal() as db:
+        result = await db.stream_scalars(
+            select(Product)
+            .options(selectinload(Product.media))
+            .order_by(Product.id)
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        async for products in result.partitions():
+            rows = [_export_row(product) for product in products]
+            if file_format == "csv":
+                yield _format_csv(rows)
+            else:
+                yield "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows)
@@ -0,0 +1,246 @@
+"""
+Time-limited stock reservations (holds) for cart lines
+
+With STOCK_RESERVATIONS_ENABLED, cart endpoints move units of regular
+(non-preorder) products from products.oki_quantity / big_quantity into
+stock_reservations, checkout converts the holds into order items (product rows
+are locked only when a hold doesn't match the ordered quantity), and a
+background sweeper returns expired holds to stock.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import Integer, String, column, delete, select, tuple_, update, values
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.product import Product
+from app.models.reservation import StockReservation
+from app.services.catalog_cache import catalog_cache
+from app.services.stock import add_to_stock
+
+logger = logging.getLogger("app.reservations")
+
+# (product_id, size) of a cart line
+HoldKey = Tuple[int, str]
+
+
+class ReservationError(Exception):
+    """Not enough stock to place or convert holds"""
+
+    def __init__(self, message: str, product_ids: List[int]):
+        super().__init__(message)
+        self.message = message
+        self.product_ids = product_ids
+
+
+async def _apply_hold_deltas(db: AsyncSession, deltas: Dict[HoldKey, int], now: datetime) -> Set[int]:
+    """
+    Add per-line deltas to product stock
+
+    Returns:
+        ids of updated products
+
+    Raises:
+        ReservationError: stock of some products would go below zero
+    """
+    # Sum deltas per product: [OKI, BIG]
+    totals: Dict[int, List[int]] = {}
+    for (product_id, size), delta in deltas.items():
+        if delta:
+            totals.setdefault(product_id, [0, 0])[0 if size == "OKI" else 1] += delta
+
+    rows = await add_to_stock(db, Product.id, totals, ReservationError, now=now)
+    return {row.id for row in rows}
+
+
+async def set_holds(db: AsyncSession, user_id: int, targets: Dict[HoldKey, int]) -> Set[int]:
+    """
+    Make the user's holds equal to the target quantities and extend their TTL
+
+    Only the difference with the current hold touches product stock. Runs in
+    the caller's transaction; on error the caller must not commit.
+
+    Returns:
+        ids of products whose stock changed (invalidate the catalog cache after commit)
+
+    Raises:
+        ReservationError
+    """
+    if not targets:
+        return set()
+
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=settings.STOCK_RESERVATION_TTL_SECONDS)
+    keys = sorted(targets)
+
+    # Lock (or create empty) hold rows first: concurrent changes of the same line wait here
+    stmt = pg_insert(StockReservation).values([
+        {
+            "user_id": user_id,
+            "product_id": product_id,
+            "size": size,
+            "quantity": 0,
+            "expires_at": expires_at,
+            "created_at": now
+        }
+        for product_id, size in keys
+    ])
+    result = await db.execute(
+        stmt.on_conflict_do_update(
+            constraint="uq_stock_reservations_user_id_product_id_size",
+            set_={"expires_at": stmt.excluded.expires_at}
+        ).returning(StockReservation.product_id, StockReservation.size, StockReservation.quantity)
+    )
+    held = {(row.product_id, row.size): row.quantity for row in result}
+
+    product_ids = await _apply_hold_deltas(db, {key: held[key] - targets[key] for key in keys}, now)
+
+    new_quantities = values(
+        column("product_id", Integer),
+        column("size", String),
+        column("quantity", Integer),
+        name="targets"
+    ).data([(product_id, size, targets[(product_id, size)]) for product_id, size in keys])
+    await db.execute(
+        update(StockReservation)
+        .where(
+            StockReservation.user_id == user_id,
+            StockReservation.product_id == new_quantities.c.product_id,
+            StockReservation.size == new_quantities.c.size
+        )
+        .values(quantity=new_quantities.c.quantity)
+        .execution_options(synchronize_session=False)
+    )
+    await db.execute(
+        delete(StockReservation)
+        .where(StockReservation.user_id == user_id, StockReservation.quantity <= 0)
+        .execution_options(synchronize_session=False)
+    )
+    return product_ids
+
+
+async def release_holds(db: AsyncSession, user_id: int, keys: Optional[Iterable[HoldKey]] = None) -> Set[int]:
+    """
+    Return the user's holds (all, or only for the given lines) to stock
+
+    Returns:
+        ids of products whose stock changed (invalidate the catalog cache after commit)
+    """
+    stmt = delete(StockReservation).where(StockReservation.user_id == user_id)
+    if keys is not None:
+        keys = list(keys)
+        if not keys:
+            return set()
+        stmt = stmt.where(tuple_(StockReservation.product_id, StockReservation.size).in_(keys))
+
+    result = await db.execute(
+        stmt.returning(StockReservation.product_id, StockReservation.size, StockReservation.quantity)
+        .execution_options(synchronize_session=False)
+    )
+    return await _apply_hold_deltas(
+        db, {(row.product_id, row.size): row.quantity for row in result}, datetime.utcnow()
+    )
+
+
+async def convert_holds(db: AsyncSession, user_id: int, needed: Dict[HoldKey, int]) -> None:
+    """
+    Turn the user's holds into ordered quantities
+
+    Holds are consumed in one DELETE; a missing or smaller hold (expired and
+    swept) takes the rest from stock, a larger one returns the excess. Runs
+    in the caller's transaction; on error the caller must not commit.
+
+    Raises:
+        ReservationError
+    """
+    if not needed:
+        return
+
+    result = await db.execute(
+        delete(StockReservation)
+        .where(
+            StockReservation.user_id == user_id,
+            tuple_(StockReservation.product_id, StockReservation.size).in_(list(needed))
+        )
+        .returning(StockReservation.product_id, StockReservation.size, StockReservation.quantity)
+        .execution_options(synchronize_session=False)
+    )
+    held = {(row.product_id, row.size): row.quantity for row in result}
+    await _apply_hold_deltas(
+        db, {key: held.get(key, 0) - quantity for key, quantity in needed.items()}, datetime.utcnow()
+    )
+
+
+async def release_expired_holds(db: AsyncSession, limit: int) -> Tuple[int, Set[int]]:
+    """
+    Return up to limit expired holds to stock
+
+    Rows locked by a concurrent cart change or checkout are skipped, so
+    several workers may sweep at once.
+
+    Returns:
+        (released holds, affected product ids)
+    """
+    now = datetime.utcnow()
+    expired = (
+        select(StockReservation.id)
+        .where(StockReservation.expires_at < now)
+        .order_by(StockReservation.expires_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    result = await db.execute(
+        delete(StockReservation)
+        .where(StockReservation.id.in_(expired))
+        .returning(StockReservation.product_id, StockReservation.size, StockReservation.quantity)
+        .execution_options(synchronize_session=False)
+    )
+    rows = result.all()
+
+    deltas: Dict[HoldKey, int] = {}
+    for row in rows:
+        key = (row.product_id, row.size)
+        deltas[key] = deltas.get(key, 0) + row.quantity
+    return len(rows), await _apply_hold_deltas(db, deltas, now)
+
+
+async def sweep_expired_holds() -> int:
+    """Release all expired holds in batches; returns the number of released holds"""
+    batch_size = settings.STOCK_RESERVATION_SWEEP_BATCH_SIZE
+    released = 0
+    product_ids: Set[int] = set()
+    async with AsyncSessionLocal() as db:
+        while True:
+            count, batch_product_ids = await release_expired_holds(db, batch_size)
+            await db.commit()
+            released += count
+            product_ids |= batch_product_ids
+            if count < batch_size:
+                break
+
+    if product_ids:
+        catalog_cache.invalidate_products(product_ids)
+    return released
+
+
+async def run_reservation_sweeper() -> None:
+    """Background task: sweep expired holds every STOCK_RESERVATION_SWEEP_INTERVAL_SECONDS"""
+    while True:
+        await asyncio.sleep(settings.STOCK_RESERVATION_SWEEP_INTERVAL_SECONDS)
+        try:
+            released = await sweep_expired_holds()
+        except Exception:
+            logger.exception("Stock reservation sweep failed")
+            continue
+        if released:
+            logger.info("Released %d expired stock reservations", released)
+
+
+if __name__ == "__main__":
+    # One-off sweep, e.g. once the TTL has passed after STOCK_RESERVATIONS_ENABLED was switched off
+    print(f"✅ Released {asyncio.run(sweep_expired_holds())} expired stock reservations")
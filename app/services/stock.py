@@ -0,0 +1,124 @@
+"""
+Set-based stock operations
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Type
+
+from sqlalchemy import Integer, Row, column, select, update, values
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.product import Product
+from app.schemas.product import StockAdjustmentItem, StockLevel
+
+# Articles per UPDATE ... FROM (VALUES ...) statement
+STOCK_BATCH_SIZE = 1000
+
+
+class StockAdjustmentError(Exception):
+    """Batch of stock deltas can't be applied"""
+
+    def __init__(self, message: str, articles: List[str]):
+        super().__init__(message)
+        self.message = message
+        self.articles = articles
+
+
+class UnknownArticlesError(StockAdjustmentError):
+    """Some articles don't exist"""
+
+
+class InsufficientStockError(StockAdjustmentError):
+    """Stock of some articles would go below zero"""
+
+
+async def add_to_stock(
+    db: AsyncSession,
+    key_column,
+    totals: Dict[Any, Sequence[int]],
+    error_type: Type[Exception],
+    unknown_error_type: Optional[Type[Exception]] = None,
+    now: Optional[datetime] = None
+) -> List[Row]:
+    """
+    Add per-product [OKI, BIG] deltas to stock in UPDATE ... FROM (VALUES ...) statements
+
+    Products are matched by key_column (Product.id or Product.article) and
+    locked in id order before updating, so concurrent multi-product changes
+    wait for each other instead of deadlocking. Deltas are added in SQL and
+    never overwrite concurrent changes. Runs in the caller's transaction; on
+    error the caller must not commit.
+
+    Returns:
+        (id, article, oki_quantity, big_quantity) rows of updated products
+
+    Raises:
+        unknown_error_type(message, keys): no product matches some keys (default: error_type)
+        error_type(message, keys): stock of some products would go below zero
+    """
+    keys = sorted(totals)
+    if not keys:
+        return []
+
+    existing = set((await db.execute(
+        select(key_column).where(key_column.in_(keys)).order_by(Product.id).with_for_update()
+    )).scalars())
+    if len(existing) < len(keys):
+        unknown = sorted(set(keys) - existing)
+        raise (unknown_error_type or error_type)(
+            f"Товары не найдены: {', '.join(map(str, unknown))}", unknown
+        )
+
+    now = now or datetime.utcnow()
+    rows: List[Row] = []
+    for start in range(0, len(keys), STOCK_BATCH_SIZE):
+        batch = keys[start:start + STOCK_BATCH_SIZE]
+        deltas = values(
+            column("key", key_column.type),
+            column("oki_delta", Integer),
+            column("big_delta", Integer),
+            name="deltas"
+        ).data([(key, *totals[key]) for key in batch])
+
+        result = await db.execute(
+            update(Product)
+            .where(
+                key_column == deltas.c.key,
+                Product.oki_quantity + deltas.c.oki_delta >= 0,
+                Product.big_quantity + deltas.c.big_delta >= 0
+            )
+            .values(
+                oki_quantity=Product.oki_quantity + deltas.c.oki_delta,
+                big_quantity=Product.big_quantity + deltas.c.big_delta,
+                updated_at=now
+            )
+            .returning(Product.id, Product.article, Product.oki_quantity, Product.big_quantity)
+            .execution_options(synchronize_session=False)
+        )
+        rows.extend(result)
+
+    if len(rows) < len(keys):
+        updated = {getattr(row, key_column.key) for row in rows}
+        short = sorted(set(keys) - updated)
+        raise error_type(f"Недостаточно товара на складе: {', '.join(map(str, short))}", short)
+
+    return rows
+
+
+async def apply_stock_deltas(db: AsyncSession, items: List[StockAdjustmentItem]) -> List[StockLevel]:
+    """
+    Apply relative per-size stock deltas by article
+
+    Runs in the caller's transaction; on error the caller must not commit.
+
+    Raises:
+        UnknownArticlesError, InsufficientStockError
+    """
+    # Sum deltas per article: [OKI, BIG]
+    totals: Dict[str, List[int]] = {}
+    for item in items:
+        totals.setdefault(item.article, [0, 0])[0 if item.size == "OKI" else 1] += item.delta
+
+    rows = await add_to_stock(
+        db, Product.article, totals, InsufficientStockError, unknown_error_type=UnknownArticlesError
+    )
+    return [StockLevel(**row._mapping) for row in rows]
@@ -0,0 +1,114 @@
+"""
+Totals for paginated listings: exact (cached), planner estimate or none
+"""
+import json
+from typing import Dict, Literal, Optional, Tuple
+
+from sqlalchemy import func, select, text
+from sqlalchemy.exc import CompileError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+TotalMode = Literal["exact", "estimate", "none"]
+
+TOTAL_MODE_DESCRIPTION = (
+    "exact - точный total (кэшируется на несколько секунд), "
+    "estimate - оценка планировщика для больших выборок, none - без total"
+)
+
+# Cached exact counts per table, keyed by SQL of the filtered query (per worker)
+_count_caches: Dict[str, TTLCache] = {}
+
+
+def _count_cache(table: str) -> TTLCache:
+    if table not in _count_caches:
+        _count_caches[table] = TTLCache(
+            maxsize=settings.COUNT_CACHE_MAX_SIZE,
+            ttl=settings.COUNT_CACHE_TTL_SECONDS
+        )
+    return _count_caches[table]
+
+
+def invalidate_counts(table: str) -> None:
+    """Drop cached counts of a table after rows were added or removed"""
+    if table in _count_caches:
+        _count_caches[table].clear()
+
+
+def _literal_sql(statement, dialect) -> Optional[str]:
+    """SQL with inlined parameters (cache key and EXPLAIN input), None if not renderable"""
+    try:
+        return str(statement.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+    except (CompileError, NotImplementedError):
+        return None
+
+
+def _explain_statement(sql: str):
+    # Colons of inlined literals (timestamps) must not be parsed as bind parameters
+    return text("EXPLAIN (FORMAT JSON) " + sql.replace(":", r"\:"))
+
+
+def _plan_rows(plan) -> int:
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def count_statement(query):
+    """SELECT count(*) over a listing query"""
+    return select(func.count()).select_from(query.subquery())
+
+
+async def count_total(db: AsyncSession, query, table: str, mode: TotalMode) -> Tuple[Optional[int], bool]:
+    """
+    Total rows of a listing query
+
+    Estimates below COUNT_ESTIMATE_MIN_ROWS are replaced by an exact count,
+    which is cheap for small results.
+
+    Returns:
+        (total or None, whether total is an estimate)
+    """
+    if mode == "none":
+        return None, False
+
+    sql = _literal_sql(query, db.get_bind().dialect)
+    if mode == "estimate" and sql is not None:
+        estimate = _plan_rows((await db.execute(_explain_statement(sql))).scalar())
+        if estimate >= settings.COUNT_ESTIMATE_MIN_ROWS:
+            return estimate, True
+
+    cache = _count_cache(table)
+    if sql is not None:
+        cached = cache.get(sql)
+        if cached is not None:
+            return cached, False
+    total = await db.scalar(count_statement(query))
+    if sql is not None:
+        cache.set(sql, total)
+    return total, False
+
+
+def count_total_sync(db: Session, query, table: str, mode: TotalMode) -> Tuple[Optional[int], bool]:
+    """count_total() for legacy Query objects on a sync Session"""
+    if mode == "none":
+        return None, False
+
+    sql = _literal_sql(query.statement, db.get_bind().dialect)
+    if mode == "estimate" and sql is not None:
+        estimate = _plan_rows(db.execute(_explain_statement(sql)).scalar())
+        if estimate >= settings.COUNT_ESTIMATE_MIN_ROWS:
+            return estimate, True
+
+    cache = _count_cache(table)
+    if sql is not None:
+        cached = cache.get(sql)
+        if cached is not None:
+            return cached, False
+    total = query.count()
+    if sql is not None:
+        cache.set(sql, total)
+    return total, False
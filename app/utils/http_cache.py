@@ -0,0 +1,103 @@
+"""
+HTTP caching utilities: ETag and conditional GET
+"""
+import hashlib
+from typing import Optional
+
+from fastapi import Request, Response, status
+
+
+# Cache-Control per resource type
+CACHE_CONTROL_CATALOG = "public, max-age=15"
+CACHE_CONTROL_PAGE = "public, max-age=300"
+CACHE_CONTROL_REVALIDATE = "no-cache"
+CACHE_CONTROL_PRIVATE = "private, no-cache"
+CACHE_CONTROL_STATIC = "public, max-age=3600"
+CACHE_CONTROL_IMMUTABLE = "public, max-age=31536000, immutable"  # fingerprinted URLs
+
+# Content codings applied by CompressionMiddleware; each gets its own ETag suffix
+ETAG_ENCODINGS = ("br", "gzip")
+
+
+def make_etag(*parts) -> str:
+    """
+    Strong ETag from version parts (id, updated_at, ...) or raw bytes
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode())
+        digest.update(b"\x00")
+    return f'"{digest.hexdigest()}"'
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """
+    ETag of a compressed representation
+
+    A strong tag validates exact bytes, so each content coding gets a suffix
+    ("abc" -> "abc-br"); weak tags are kept as is.
+    """
+    if etag.startswith("W/") or not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def _identity_etag(tag: str) -> str:
+    """Tag without W/ prefix and encoding suffix"""
+    tag = tag.strip().removeprefix("W/")
+    for encoding in ETAG_ENCODINGS:
+        suffix = f'-{encoding}"'
+        if tag.endswith(suffix):
+            return tag[:-len(suffix)] + '"'
+    return tag
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    Weak comparison of If-None-Match with ETag
+
+    Tags the client got for any compressed representation of the same content
+    match too.
+    """
+    if if_none_match.strip() == "*":
+        return True
+    return _identity_etag(etag) in {_identity_etag(tag) for tag in if_none_match.split(",")}
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """
+    Check If-None-Match request header against ETag
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    return etag_matches(header, etag)
+
+
+def not_modified_response(etag: str, cache_control: str) -> Response:
+    """
+    304 response without body
+    """
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={"ETag": etag, "Cache-Control": cache_control}
+    )
+
+
+def conditional_json_response(
+    request: Request,
+    payload: bytes,
+    cache_control: str,
+    etag: Optional[str] = None
+) -> Response:
+    """
+    JSON response with ETag (content hash by default), 304 if client copy is fresh
+    """
+    etag = etag or make_etag(payload)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag, cache_control)
+    return Response(
+        content=payload,
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": cache_control}
+    )
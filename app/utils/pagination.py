@@ -0,0 +1,64 @@
+"""
+Keyset (cursor) pagination utilities
+"""
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import tuple_
+
+
+def encode_cursor(created_at: datetime, item_id: int) -> str:
+    """
+    Encode position (created_at, id) into opaque cursor string
+    """
+    raw = json.dumps({"c": created_at.isoformat(), "i": item_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Decode cursor string into (created_at, id)
+    
+    Raises:
+        HTTPException 400 if cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        return datetime.fromisoformat(data["c"]), int(data["i"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Неверный курсор пагинации"
+        )
+
+
+def apply_keyset(query, model, cursor: Optional[str], limit: int, descending: bool = False):
+    """
+    Order query by (created_at, id), seek past cursor and fetch one extra row
+    
+    Works for both Select and legacy Query objects. Use with split_page().
+    """
+    key = tuple_(model.created_at, model.id)
+    if cursor:
+        position = tuple_(*decode_cursor(cursor))
+        query = query.where(key < position if descending else key > position)
+    if descending:
+        query = query.order_by(model.created_at.desc(), model.id.desc())
+    else:
+        query = query.order_by(model.created_at, model.id)
+    return query.limit(limit + 1)
+
+
+def split_page(items: List, limit: int) -> Tuple[List, Optional[str]]:
+    """
+    Trim extra row fetched by apply_keyset() and build next cursor
+    """
+    if len(items) <= limit:
+        return list(items), None
+    items = list(items[:limit])
+    last = items[-1]
+    return items, encode_cursor(last.created_at, last.id)
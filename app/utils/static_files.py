@@ -0,0 +1,83 @@
+"""
+Static file serving with long-lived caching and precompressed variants
+"""
+import mimetypes
+import os
+import stat
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+from app.utils.http_cache import CACHE_CONTROL_IMMUTABLE, CACHE_CONTROL_STATIC, etag_matches
+
+# Text-based assets worth storing precompressed (raster images are already compressed)
+COMPRESSIBLE_EXTENSIONS = {".svg", ".css", ".js", ".json", ".txt", ".html", ".xml"}
+
+# Content-Encoding -> file suffix, in order of preference
+PRECOMPRESSED_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+# Files under these static paths are never rewritten (content-addressed uploads)
+IMMUTABLE_PREFIXES = ("uploads/",)
+
+
+def is_compressible(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() in COMPRESSIBLE_EXTENSIONS
+
+
+class CachedStaticFiles(StaticFiles):
+    """
+    StaticFiles with Cache-Control headers and precompressed .br/.gz siblings
+
+    Same behaviour as Caddy's file_server with `precompressed br gzip`, for
+    deployments where the app serves /static itself.
+    """
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        response = None
+        compressible = is_compressible(path)
+        if compressible:
+            response = await self._precompressed_response(path, scope)
+        if response is None:
+            response = await super().get_response(path, scope)
+
+        if response.status_code in (200, 304):
+            immutable = path.replace(os.sep, "/").startswith(IMMUTABLE_PREFIXES)
+            response.headers["Cache-Control"] = CACHE_CONTROL_IMMUTABLE if immutable else CACHE_CONTROL_STATIC
+            if compressible:
+                response.headers["Vary"] = "Accept-Encoding"
+        return response
+
+    def is_not_modified(self, response_headers: Headers, request_headers: Headers) -> bool:
+        # Accept tags of representations compressed by CompressionMiddleware ("...-br")
+        if_none_match = request_headers.get("if-none-match")
+        etag = response_headers.get("etag")
+        if if_none_match and etag:
+            return etag_matches(if_none_match, etag)
+        return super().is_not_modified(response_headers, request_headers)
+
+    async def _precompressed_response(self, path: str, scope: Scope):
+        request_headers = Headers(scope=scope)
+        accepted = {
+            value.split(";")[0].strip().lower()
+            for value in request_headers.get("accept-encoding", "").split(",")
+        }
+        for encoding, suffix in PRECOMPRESSED_ENCODINGS:
+            if encoding not in accepted:
+                continue
+            full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path + suffix)
+            if stat_result is None or not stat.S_ISREG(stat_result.st_mode):
+                continue
+            response = FileResponse(
+                full_path,
+                stat_result=stat_result,
+                method=scope["method"],
+                media_type=mimetypes.guess_type(path)[0] or "application/octet-stream",
+                headers={"Content-Encoding": encoding}
+            )
+            if self.is_not_modified(response.headers, request_headers):
+                return NotModifiedResponse(response.headers)
+            return response
+        return None
@@ -0,0 +1,164 @@
+"""
+Benchmark: per-item serialization cost of a cart with products
+
+Compares the former hand-built dict + CartWithProductsResponse validation
+with the shared cart serializer (cold and warm product fragment cache).
+
+Usage:
+    python -m scripts.bench_cart_serializer [--items 20] [--repeat 200]
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import ORJSONResponse
+
+from app.models.product import OrderType
+from app.schemas.cart import CartWithProductsResponse
+from app.services.cart_serializer import cart_payload, product_fragments
+
+
+def build_cart(items_count: int):
+    now = datetime.utcnow()
+    items = []
+    for idx in range(items_count):
+        product_id = idx + 1
+        product = SimpleNamespace(
+            id=product_id,
+            name=f"Футболка DWC модель {product_id}",
+            description="Дизайнерская футболка из плотного хлопка. " * 4,
+            article=f"DWC-TS-{product_id:03d}",
+            price=2500.0 + product_id * 10,
+            oki_quantity=10,
+            big_quantity=5,
+            sizes={"OKI": 10, "BIG": 5},
+            stock_count=15,
+            size_table={"OKI": {"chest": 104, "length": 70}, "BIG": {"chest": 120, "length": 76}},
+            care_instructions="Стирка при 30°C, не отбеливать",
+            preview_image_url=f"/static/uploads/products/preview_{product_id:032x}.jpg",
+            order_type=OrderType.ORDER,
+            preorder_waves_total=0,
+            preorder_wave_capacity=0,
+            current_wave=1,
+            current_wave_count=0,
+            production_status=None,
+            is_active=True,
+            is_archived=False,
+            created_at=now - timedelta(days=30),
+            updated_at=now - timedelta(days=1),
+            media=[
+                SimpleNamespace(
+                    id=product_id * 10 + media_idx,
+                    url=f"/static/uploads/products/{product_id:030x}{media_idx:02d}.jpg",
+                    order=media_idx,
+                    created_at=now - timedelta(days=30),
+                )
+                for media_idx in range(3)
+            ],
+        )
+        items.append(SimpleNamespace(
+            id=idx + 1,
+            product_id=product_id,
+            size="OKI",
+            quantity=1,
+            created_at=now,
+            product=product,
+        ))
+    return SimpleNamespace(id=1, user_id=1, created_at=now, updated_at=now, items=items)
+
+
+def hand_built_response(cart) -> bytes:
+    """Former get_cart: nested dicts, model validation, jsonable_encoder"""
+    data = {
+        "id": cart.id,
+        "user_id": cart.user_id,
+        "created_at": cart.created_at,
+        "updated_at": cart.updated_at,
+        "items": [
+            {
+                "id": item.id,
+                "product_id": item.product_id,
+                "size": item.size,
+                "quantity": item.quantity,
+                "created_at": item.created_at,
+                "product_name": item.product.name,
+                "product_price": item.product.price,
+                "product_article": item.product.article,
+                "product": {
+                    "id": item.product.id,
+                    "name": item.product.name,
+                    "description": item.product.description,
+                    "article": item.product.article,
+                    "price": item.product.price,
+                    "sizes": item.product.sizes,
+                    "size_table": item.product.size_table,
+                    "care_instructions": item.product.care_instructions,
+                    "preview_image_url": item.product.preview_image_url,
+                    "order_type": item.product.order_type.value,
+                    "stock_count": item.product.stock_count,
+                    "preorder_waves_total": item.product.preorder_waves_total,
+                    "preorder_wave_capacity": item.product.preorder_wave_capacity,
+                    "current_wave": item.product.current_wave,
+                    "current_wave_count": item.product.current_wave_count,
+                    "is_active": item.product.is_active,
+                    "is_archived": item.product.is_archived,
+                    "created_at": item.product.created_at,
+                    "updated_at": item.product.updated_at,
+                    "media": [
+                        {"url": media.url, "order": media.order, "id": media.id, "created_at": media.created_at}
+                        for media in item.product.media
+                    ],
+                },
+            }
+            for item in cart.items
+        ],
+        "total_items": sum(item.quantity for item in cart.items),
+        "total_amount": sum(item.quantity * item.product.price for item in cart.items),
+    }
+    response = CartWithProductsResponse(**data)
+    return ORJSONResponse(jsonable_encoder(response)).body
+
+
+def serializer_cold(cart) -> bytes:
+    product_fragments.clear()
+    return ORJSONResponse(cart_payload(cart)).body
+
+
+def serializer_warm(cart) -> bytes:
+    return ORJSONResponse(cart_payload(cart)).body
+
+
+def measure(func, cart, repeat: int) -> float:
+    """Best time of repeat runs, ms"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(cart)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--items", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    cart = build_cart(args.items)
+    serializer_warm(cart)  # fill fragment cache
+
+    print(f"Cart with {args.items} items, best of {args.repeat}\n")
+    print(f"{'serializer':<28}{'cart, ms':>10}{'per item, µs':>14}")
+    for name, func in (
+        ("hand-built dict + model", hand_built_response),
+        ("shared serializer (cold)", serializer_cold),
+        ("shared serializer (warm)", serializer_warm),
+    ):
+        elapsed = measure(func, cart, args.repeat)
+        print(f"{name:<28}{elapsed:>10.3f}{elapsed * 1000 / args.items:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
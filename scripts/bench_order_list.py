@@ -0,0 +1,143 @@
+"""
+Benchmark: payload size and serialization time of OrderListResponse
+
+Builds 100 orders with 3 items each (full product objects, as returned by
+GET /orders/admin/all) and compares the default FastAPI JSON path with
+orjson and pydantic's model_dump_json, plus gzip/brotli sizes.
+
+Usage:
+    python -m scripts.bench_order_list [--orders 100] [--items 3] [--repeat 50]
+"""
+import argparse
+import gzip
+import json
+import time
+from datetime import datetime, timedelta
+
+import brotli
+import orjson
+from fastapi.encoders import jsonable_encoder
+
+from app.core.config import settings
+from app.schemas.order import OrderListResponse
+
+
+def build_response(orders_count: int, items_per_order: int) -> OrderListResponse:
+    now = datetime.utcnow()
+    orders = []
+    for order_id in range(1, orders_count + 1):
+        items = []
+        for item_idx in range(items_per_order):
+            product_id = (order_id * items_per_order + item_idx) % 50 + 1
+            items.append({
+                "id": order_id * 10 + item_idx,
+                "product_id": product_id,
+                "size": "OKI" if item_idx % 2 else "BIG",
+                "quantity": 1 + item_idx,
+                "price": 2500.0 + product_id * 10,
+                "is_preorder": False,
+                "created_at": now,
+                "product": {
+                    "id": product_id,
+                    "name": f"Футболка DWC модель {product_id}",
+                    "description": "Дизайнерская футболка из плотного хлопка. " * 4,
+                    "article": f"DWC-TS-{product_id:03d}",
+                    "price": 2500.0 + product_id * 10,
+                    "oki_quantity": 10,
+                    "big_quantity": 5,
+                    "size_table": {"OKI": {"chest": 104, "length": 70}, "BIG": {"chest": 120, "length": 76}},
+                    "care_instructions": "Стирка при 30°C, не отбеливать",
+                    "preview_image_url": f"/static/uploads/products/preview_{product_id:032x}.jpg",
+                    "order_type": "order",
+                    "stock_count": 15,
+                    "preorder_waves_total": 0,
+                    "preorder_wave_capacity": 0,
+                    "current_wave": 1,
+                    "current_wave_count": 0,
+                    "is_active": True,
+                    "is_archived": False,
+                    "created_at": now - timedelta(days=30),
+                    "updated_at": now - timedelta(days=1),
+                    "media": [
+                        {
+                            "id": product_id * 10 + media_idx,
+                            "url": f"/static/uploads/products/{product_id:030x}{media_idx:02d}.jpg",
+                            "order": media_idx,
+                            "created_at": now - timedelta(days=30),
+                        }
+                        for media_idx in range(3)
+                    ],
+                    "sizes": {"OKI": 10, "BIG": 5},
+                },
+            })
+        orders.append({
+            "id": order_id,
+            "order_number": f"DWC-{order_id:08d}",
+            "total_amount": 7500.0,
+            "discount_amount": 0.0,
+            "final_amount": 7500.0,
+            "status": "paid",
+            "delivery_address": "г. Москва, ул. Примерная, д. 1, кв. 1",
+            "created_at": now - timedelta(hours=order_id),
+            "updated_at": now,
+            "items": items,
+        })
+    return OrderListResponse(orders=orders, total=orders_count, page=1, page_size=orders_count)
+
+
+def measure(func, repeat: int) -> float:
+    """Best time of repeat runs, ms"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--orders", type=int, default=100)
+    parser.add_argument("--items", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    response = build_response(args.orders, args.items)
+
+    serializers = {
+        # JSONResponse: jsonable_encoder + json.dumps
+        "json (default)": lambda: json.dumps(
+            jsonable_encoder(response), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+        ).encode("utf-8"),
+        # ORJSONResponse: jsonable_encoder + orjson.dumps
+        "orjson": lambda: orjson.dumps(jsonable_encoder(response)),
+        # Pre-serialized bytes (catalog/ETag responses)
+        "model_dump_json": lambda: response.model_dump_json().encode(),
+    }
+
+    print(f"OrderListResponse: {args.orders} orders x {args.items} items, best of {args.repeat}\n")
+    print(f"{'serializer':<18}{'time, ms':>10}")
+    for name, serialize in serializers.items():
+        print(f"{name:<18}{measure(serialize, args.repeat):>10.2f}")
+
+    body = serializers["orjson"]()
+    encoders = {
+        "identity": lambda: body,
+        f"gzip -{settings.COMPRESSION_GZIP_LEVEL}": lambda: gzip.compress(
+            body, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0
+        ),
+        f"brotli q{settings.COMPRESSION_BROTLI_QUALITY}": lambda: brotli.compress(
+            body, quality=settings.COMPRESSION_BROTLI_QUALITY
+        ),
+    }
+    print(f"\n{'encoding':<18}{'size, KB':>10}{'ratio':>8}{'time, ms':>10}")
+    for name, encode in encoders.items():
+        size = len(encode())
+        print(
+            f"{name:<18}{size / 1024:>10.1f}{size / len(body):>8.2f}"
+            f"{measure(encode, args.repeat):>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Shared fixtures
+
+Database tests run against a disposable PostgreSQL database given by
+TEST_DATABASE_URL: all tables are dropped and created from the models.
+Without it those tests are skipped.
+"""
+import os
+
+import pytest
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+if TEST_DATABASE_URL:
+    # Settings are read when app modules are imported: point them at the test database
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+
+
+@pytest.fixture(scope="session")
+def engine():
+    from sqlalchemy import create_engine
+
+    import app.models  # noqa: F401 - register all tables
+    from app.core.database import Base
+
+    engine = create_engine(TEST_DATABASE_URL)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    yield engine
+    Base.metadata.drop_all(engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    """Session in a transaction that is rolled back after the test"""
+    from sqlalchemy.orm import Session
+
+    connection = engine.connect()
+    transaction = connection.begin()
+    session = Session(bind=connection, join_transaction_mode="create_savepoint")
+    yield session
+    session.close()
+    transaction.rollback()
+    connection.close()
+
+
+@pytest.fixture
+def client(db):
+    """TestClient whose sync get_db dependency uses the test session (lifespan is not run)"""
+    from fastapi.testclient import TestClient
+
+    from app.core.database import get_db
+    from app.main import app
+
+    app.dependency_overrides[get_db] = lambda: db
+    yield TestClient(app)
+    app.dependency_overrides.clear()
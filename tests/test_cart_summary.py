@@ -0,0 +1,82 @@
+"""
+GET /cart/summary availability with stock reservations
+"""
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+if not os.getenv("TEST_DATABASE_URL"):
+    pytest.skip("TEST_DATABASE_URL is not set", allow_module_level=True)
+
+from app.api.endpoints.cart import cart_summary_query
+from app.core.config import settings
+from app.models.cart import Cart, CartItem
+from app.models.product import Product
+from app.models.reservation import StockReservation
+from app.models.user import User
+
+
+@pytest.fixture
+def reservations_enabled(monkeypatch):
+    monkeypatch.setattr(settings, "STOCK_RESERVATIONS_ENABLED", True)
+
+
+def add_held_line(db, user, cart, product, size, quantity, held):
+    """Cart line whose held units are already subtracted from product stock (as set_holds does)"""
+    db.add(CartItem(cart_id=cart.id, product_id=product.id, size=size, quantity=quantity))
+    if held:
+        db.add(StockReservation(
+            user_id=user.id,
+            product_id=product.id,
+            size=size,
+            quantity=held,
+            expires_at=datetime.utcnow() + timedelta(minutes=15)
+        ))
+
+
+@pytest.fixture
+def user_cart(db):
+    user = User(phone="+79000001000", password_hash="x")
+    db.add(user)
+    db.flush()
+    cart = Cart(user_id=user.id)
+    db.add(cart)
+    db.flush()
+    return user, cart
+
+
+def test_fully_held_cart_is_available(db, user_cart, reservations_enabled):
+    user, cart = user_cart
+    # Whole stock of both products is held by this user's cart
+    shirt = Product(name="Футболка", article="DWC-SUM-001", price=2500, oki_quantity=0, big_quantity=0)
+    hoodie = Product(name="Худи", article="DWC-SUM-002", price=5000, oki_quantity=1, big_quantity=0)
+    db.add_all([shirt, hoodie])
+    db.flush()
+    add_held_line(db, user, cart, shirt, "OKI", 2, held=2)
+    add_held_line(db, user, cart, hoodie, "BIG", 1, held=1)
+    db.flush()
+
+    rows = db.execute(cart_summary_query(user.id)).all()
+
+    assert [row.is_available for row in rows] == [True, True]
+    assert [row.available_quantity for row in rows] == [2, 1]
+    assert rows[0].has_unavailable is False
+    assert rows[0].total_items == 3
+    assert rows[0].total_amount == 10000
+
+
+def test_line_above_stock_and_hold_is_unavailable(db, user_cart, reservations_enabled):
+    user, cart = user_cart
+    product = Product(name="Футболка", article="DWC-SUM-003", price=2500, oki_quantity=1, big_quantity=0)
+    db.add(product)
+    db.flush()
+    # 1 held + 1 left in stock for a line of 3
+    add_held_line(db, user, cart, product, "OKI", 3, held=1)
+    db.flush()
+
+    row = db.execute(cart_summary_query(user.id)).one()
+
+    assert row.available_quantity == 2
+    assert row.is_available is False
+    assert row.has_unavailable is True
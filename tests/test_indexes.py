@@ -0,0 +1,176 @@
+"""
+Hot queries are planned with the indexes added for them (i1234567890)
+
+Statements come from the same helpers the endpoints use; each test runs them,
+records the SQL actually sent (including selectinload queries) and EXPLAINs it.
+"""
+import asyncio
+import os
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+
+if not os.getenv("TEST_DATABASE_URL"):
+    pytest.skip("TEST_DATABASE_URL is not set", allow_module_level=True)
+
+from sqlalchemy import event, text
+
+from app.api.endpoints.analytics import get_sales_statistics
+from app.api.endpoints.cart import cart_summary_query
+from app.api.endpoints.orders import admin_orders_query, orders_page_query, user_orders_query
+from app.api.endpoints.payment import order_by_payment_id_query
+from app.api.endpoints.products import catalog_query, product_usage_query
+from app.models.cart import Cart, CartItem
+from app.models.order import Order, OrderItem, OrderStatus, PaymentStatus
+from app.models.product import Product, ProductMedia
+from app.models.user import User
+from app.utils.counting import count_statement
+
+USERS = 20
+PRODUCTS = 20
+ORDERS_PER_USER = 5
+
+STATUSES = list(OrderStatus)
+PAYMENT_STATUSES = list(PaymentStatus)
+
+
+@pytest.fixture
+def seeded(db):
+    """Users with carts and orders of varied status and age, products with media; statistics analyzed"""
+    users = [User(phone=f"+7900000{idx:04d}", password_hash="x") for idx in range(USERS)]
+    products = [
+        Product(name=f"Товар {idx}", article=f"DWC-IDX-{idx:03d}", price=1000, oki_quantity=5, big_quantity=5)
+        for idx in range(PRODUCTS)
+    ]
+    db.add_all(users + products)
+    db.flush()
+
+    now = datetime.utcnow()
+    for idx, user in enumerate(users):
+        cart = Cart(user_id=user.id)
+        db.add(cart)
+        db.flush()
+        product = products[idx % PRODUCTS]
+        db.add(CartItem(cart_id=cart.id, product_id=product.id, size="OKI", quantity=1))
+        for number in range(ORDERS_PER_USER):
+            seq = idx * ORDERS_PER_USER + number
+            order = Order(
+                user_id=user.id,
+                order_number=f"DWC-IDX-{idx}-{number}",
+                total_amount=1000,
+                final_amount=1000,
+                status=STATUSES[seq % len(STATUSES)],
+                payment_status=PAYMENT_STATUSES[seq % len(PAYMENT_STATUSES)],
+                payment_id=f"payment-{idx}-{number}" if number % 2 else None,
+                created_at=now - timedelta(days=seq)
+            )
+            order.items.append(OrderItem(product_id=product.id, size="OKI", quantity=1, price=1000))
+            db.add(order)
+    for product in products:
+        db.add(ProductMedia(product_id=product.id, url=f"/static/uploads/products/{product.article}.jpg"))
+    db.flush()
+
+    for table in ("users", "products", "product_media", "carts", "cart_items", "orders", "order_items"):
+        db.execute(text(f"ANALYZE {table}"))
+    # Tables are tiny: make the planner show whether an index can serve the query at all
+    db.execute(text("SET LOCAL enable_seqscan = off"))
+    return users, products
+
+
+def index_names(plan) -> set:
+    """Names of all indexes used anywhere in an EXPLAIN (FORMAT JSON) plan"""
+    names = set()
+    if isinstance(plan, dict):
+        if "Index Name" in plan:
+            names.add(plan["Index Name"])
+        for value in plan.values():
+            names |= index_names(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            names |= index_names(value)
+    return names
+
+
+@contextmanager
+def planned_indexes(db):
+    """Collect indexes the planner picks for every SELECT run inside the block"""
+    connection = db.connection()
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            executed.append((statement, parameters))
+
+    names = set()
+    event.listen(connection, "before_cursor_execute", record)
+    try:
+        yield names
+    finally:
+        event.remove(connection, "before_cursor_execute", record)
+
+    assert executed, "no SELECT was executed"
+    for statement, parameters in executed:
+        plan = connection.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters).scalar()
+        names |= index_names(plan)
+
+
+def test_order_history_uses_user_created_at_and_loader_indexes(db, seeded):
+    users, _ = seeded
+    # GET /orders/ (order_items_loader: items -> product -> media)
+    with planned_indexes(db) as names:
+        db.execute(orders_page_query(user_orders_query(users[0].id), None, 0, 10)).scalars().all()
+    assert "ix_orders_user_id_created_at" in names
+    assert "ix_order_items_order_id" in names
+    assert "ix_product_media_product_id" in names
+
+
+def test_admin_order_list_uses_status_created_at_index(db, seeded):
+    # GET /orders/admin/all?status=paid: total and first page
+    query = admin_orders_query(OrderStatus.paid)
+    with planned_indexes(db) as names:
+        db.scalar(count_statement(query))
+        db.execute(orders_page_query(query, None, 0, 10)).scalars().all()
+    assert "ix_orders_status_created_at" in names
+
+
+def test_sales_statistics_use_created_at_payment_status_index(db, seeded):
+    # GET /analytics/sales: paid orders in a date range
+    end_date = datetime.utcnow()
+    with planned_indexes(db) as names:
+        asyncio.run(get_sales_statistics(
+            start_date=end_date - timedelta(days=30), end_date=end_date, db=db, current_admin=None
+        ))
+    assert "ix_orders_created_at_payment_status" in names
+
+
+def test_payment_webhook_uses_partial_payment_id_index(db, seeded):
+    # POST /payment/webhook
+    with planned_indexes(db) as names:
+        db.execute(order_by_payment_id_query("payment-3-1")).scalar_one_or_none()
+    assert "ix_orders_payment_id" in names
+
+
+def test_cart_summary_uses_unique_cart_product_size_index(db, seeded):
+    users, _ = seeded
+    # GET /cart/; ix_cart_items_cart_id_product_id_size became this unique constraint (m1234567890)
+    with planned_indexes(db) as names:
+        db.execute(cart_summary_query(users[0].id)).all()
+    assert "uq_cart_items_cart_id_product_id_size" in names
+
+
+def test_product_usage_checks_use_product_id_indexes(db, seeded):
+    _, products = seeded
+    # DELETE /products/{id} refuses products that are ordered or still in carts
+    with planned_indexes(db) as names:
+        db.scalar(product_usage_query(OrderItem, products[0].id))
+        db.scalar(product_usage_query(CartItem, products[0].id))
+    assert "ix_order_items_product_id" in names
+    assert "ix_cart_items_product_id" in names
+
+
+def test_catalog_total_uses_active_archived_index(db, seeded):
+    # total of GET /products/?is_active=true&is_archived=false
+    with planned_indexes(db) as names:
+        db.scalar(count_statement(catalog_query(True, False)))
+    assert "ix_products_is_active_is_archived_id" in names
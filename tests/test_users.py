@@ -0,0 +1,47 @@
+"""
+Profile endpoints with a cached (possibly stale) authenticated user
+"""
+import os
+
+import pytest
+
+if not os.getenv("TEST_DATABASE_URL"):
+    pytest.skip("TEST_DATABASE_URL is not set", allow_module_level=True)
+
+from sqlalchemy import update
+
+from app.core.security import create_access_token, user_cache
+from app.models.user import User
+
+
+@pytest.fixture
+def cached_user(db):
+    """User authenticated in this worker, then deactivated elsewhere within the cache TTL"""
+    user = User(phone="+79000002000", password_hash="x", full_name="Старое имя", is_active=True)
+    db.add(user)
+    db.flush()
+
+    # Snapshot as get_current_user caches it: detached, is_active=True
+    db.expunge(user)
+    user_cache.set(user.id, user)
+
+    # Deactivation by another worker: the row changes, this worker's cache doesn't
+    db.execute(update(User).where(User.id == user.id).values(is_active=False))
+    yield user
+    user_cache.delete(user.id)
+
+
+def test_profile_update_keeps_deactivation(db, client, cached_user):
+    token = create_access_token({"sub": str(cached_user.id)})
+
+    response = client.put(
+        "/api/v1/users/me",
+        json={"full_name": "Новое имя"},
+        headers={"Authorization": f"Bearer {token}"}
+    )
+
+    assert response.status_code == 200
+    assert response.json()["is_active"] is False
+    row = db.get(User, cached_user.id, populate_existing=True)
+    assert row.full_name == "Новое имя"
+    assert row.is_active is False